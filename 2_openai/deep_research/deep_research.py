@@ -1,23 +1,48 @@
+import asyncio
+import os
+import threading
 import gradio as gr
 from dotenv import load_dotenv
-from research_manager import ResearchManager
+from research_jobs import submit, job_status, run_workers
 
 load_dotenv(override=True)
 
+# Research runs as jobs on a worker pool so that reports survive the browser disconnecting;
+# set RESEARCH_UI_WORKERS=0 to leave the jobs to workers started with `python research_jobs.py work`
 
-async def run(query: str):
-    async for chunk in ResearchManager().run(query):
-        yield chunk
+UI_WORKERS = int(os.getenv("RESEARCH_UI_WORKERS", "2"))
+
+
+def submit_job(query: str, streaming: bool) -> str:
+    return submit(query, streaming) if query.strip() else ""
+
+
+def show_job(job_id: str) -> str:
+    if not job_id.strip():
+        return ""
+    status = job_status(job_id.strip())
+    if status is None:
+        return f"No job {job_id}"
+    header = f"**{status['status'].capitalize()}** (attempt {status['attempts']}): {status['query']}"
+    if status["error"]:
+        header += f"\n\nLast error: {status['error']}"
+    return f"{header}\n\n{status['report'] or status['message']}"
 
 
 with gr.Blocks(theme=gr.themes.Default(primary_hue="sky")) as ui:
     gr.Markdown("# Marley AI - Do you SEE???")
     query_textbox = gr.Textbox(label="What topic would you like to research?")
+    streaming_checkbox = gr.Checkbox(label="Write sections as search results arrive", value=True)
     run_button = gr.Button("Run", variant="primary")
+    job_textbox = gr.Textbox(label="Job id (paste one to follow an earlier job)")
     report = gr.Markdown(label="Report")
-    
-    run_button.click(fn=run, inputs=query_textbox, outputs=report)
-    query_textbox.submit(fn=run, inputs=query_textbox, outputs=report)
+    timer = gr.Timer(value=2)
 
-ui.launch(inbrowser=True)
+    run_button.click(fn=submit_job, inputs=[query_textbox, streaming_checkbox], outputs=job_textbox, api_name="submit")
+    query_textbox.submit(fn=submit_job, inputs=[query_textbox, streaming_checkbox], outputs=job_textbox)
+    timer.tick(fn=show_job, inputs=job_textbox, outputs=report, api_name="status")
+
+if UI_WORKERS:
+    threading.Thread(target=asyncio.run, args=(run_workers(UI_WORKERS),), daemon=True).start()
 
+ui.launch(inbrowser=True)
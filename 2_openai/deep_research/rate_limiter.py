@@ -0,0 +1,120 @@
+import asyncio
+import os
+import random
+import time
+from openai import RateLimitError
+from agents import Agent, WebSearchTool
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+MAX_RETRIES = 4
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+# Requests per minute and calls in flight for each limiter, overridable with RATE_LIMIT_<KEY>_RPM
+# and RATE_LIMIT_<KEY>_IN_FLIGHT, where the key is web_search or the model name in upper case
+
+DEFAULT_LIMITS = {
+    "web_search": (60, 5),
+    "model": (500, 10),
+}
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return isinstance(error, RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """The wait the provider asked for in its retry-after-ms or retry-after header, if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+class RateLimiter:
+    """
+    A token bucket refilled at requests_per_minute, allowing bursts of up to burst calls, together with a
+    semaphore capping the calls in flight. Calls rejected with a rate limit error are retried after the
+    provider's retry-after if it gave one, otherwise after a jittered exponential backoff.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, max_in_flight: int, burst: int | None = None):
+        self.name = name
+        self.rate = requests_per_minute / 60
+        self.capacity = burst or max_in_flight
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.lock = asyncio.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.throttled += 1
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def run(self, call):
+        """Await call(), a function returning a fresh awaitable for each attempt, within the limits"""
+        for attempt in range(MAX_RETRIES + 1):
+            await self.acquire()
+            async with self.in_flight:
+                self.calls += 1
+                try:
+                    return await call()
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt == MAX_RETRIES:
+                        self.failed += 1
+                        raise
+                    error = e
+            self.retried += 1
+            delay = retry_after_seconds(error)
+            if delay is None:
+                delay = random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2**attempt))
+            print(f"{self.name} rate limited, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "throttled": self.throttled, "retried": self.retried, "failed": self.failed}
+
+
+limiters: dict[str, RateLimiter] = {}
+
+
+def limiter_key(agent: Agent) -> str:
+    """Agents that search the web share the web search limit; the rest are limited per model"""
+    if any(isinstance(tool, WebSearchTool) for tool in agent.tools):
+        return "web_search"
+    return str(agent.model)
+
+
+def limiter_for(agent: Agent) -> RateLimiter:
+    key = limiter_key(agent)
+    if key not in limiters:
+        rpm, in_flight = DEFAULT_LIMITS["web_search" if key == "web_search" else "model"]
+        env_key = key.upper().replace("-", "_").replace(".", "_")
+        rpm = float(os.getenv(f"RATE_LIMIT_{env_key}_RPM", rpm))
+        in_flight = int(os.getenv(f"RATE_LIMIT_{env_key}_IN_FLIGHT", in_flight))
+        limiters[key] = RateLimiter(key, rpm, in_flight)
+    return limiters[key]
+
+
+def limiter_stats() -> dict[str, dict]:
+    return {key: limiter.stats() for key, limiter in limiters.items()}
@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+from research_manager import ResearchManager
+from writer_agent import ReportData
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+DB = os.getenv("RESEARCH_JOBS_DB", "research_jobs.db")
+
+# At most MAX_CONCURRENT_JOBS research pipelines run at once across all worker processes sharing the database.
+# A running job holds a lease renewed every LEASE_SECONDS / 3; a job whose lease lapses, because its worker died,
+# is picked up again and resumes from its last checkpointed stage. A job failing MAX_ATTEMPTS times is given up.
+
+MAX_CONCURRENT_JOBS = int(os.getenv("RESEARCH_MAX_CONCURRENT_JOBS", "4"))
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 2
+
+with sqlite3.connect(DB) as conn:
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            query TEXT,
+            streaming INTEGER,
+            status TEXT,
+            message TEXT,
+            error TEXT,
+            attempts INTEGER DEFAULT 0,
+            created REAL,
+            updated REAL,
+            lease_until REAL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            job_id TEXT,
+            stage TEXT,
+            data TEXT,
+            PRIMARY KEY (job_id, stage)
+        )
+    """)
+    conn.commit()
+
+
+def connect() -> sqlite3.Connection:
+    return sqlite3.connect(DB, timeout=30)
+
+
+def submit(query: str, streaming: bool = False) -> str:
+    """Queue a research job, returning its id"""
+    return submit_many([query], streaming)[0]
+
+
+def submit_many(queries: list[str], streaming: bool = False) -> list[str]:
+    now = time.time()
+    ids = [uuid.uuid4().hex[:12] for _ in queries]
+    with connect() as conn:
+        conn.executemany(
+            "INSERT INTO jobs (id, query, streaming, status, message, created, updated) VALUES (?, ?, ?, 'queued', 'Queued', ?, ?)",
+            [(job_id, query, int(streaming), now, now) for job_id, query in zip(ids, queries)],
+        )
+    return ids
+
+
+def claim(max_concurrent: int = MAX_CONCURRENT_JOBS) -> tuple[str, str, bool] | None:
+    """
+    Take the oldest queued job, or a running job whose lease has lapsed, as (id, query, streaming),
+    unless max_concurrent jobs are already running
+    """
+    now = time.time()
+    with connect() as conn:
+        row = conn.execute(
+            """
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated = ?
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)
+                ORDER BY created LIMIT 1
+            )
+            AND (SELECT COUNT(*) FROM jobs WHERE status = 'running' AND lease_until >= ?) < ?
+            RETURNING id, query, streaming
+            """,
+            (now + LEASE_SECONDS, now, now, now, max_concurrent),
+        ).fetchone()
+    return (row[0], row[1], bool(row[2])) if row else None
+
+
+def renew(job_id: str, message: str | None = None) -> None:
+    now = time.time()
+    with connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET message = COALESCE(?, message), updated = ?, lease_until = ? WHERE id = ?",
+            (message, now, now + LEASE_SECONDS, job_id),
+        )
+
+
+def finish(job_id: str, message: str) -> None:
+    with connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'done', message = ?, error = NULL, updated = ?, lease_until = NULL WHERE id = ?",
+            (message, time.time(), job_id),
+        )
+
+
+def fail(job_id: str, error: str) -> None:
+    """Requeue the job to resume from its checkpoints, or mark it failed once it has used up its attempts"""
+    with connect() as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                error = ?, updated = ?, lease_until = NULL
+            WHERE id = ?
+            """,
+            (MAX_ATTEMPTS, error, time.time(), job_id),
+        )
+
+
+def retry(job_id: str) -> bool:
+    """Requeue a failed job with fresh attempts, keeping its checkpoints"""
+    with connect() as conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, updated = ? WHERE id = ? AND status = 'failed'",
+            (time.time(), job_id),
+        )
+    return cursor.rowcount > 0
+
+
+def load_checkpoint(job_id: str, stage: str) -> str | None:
+    with connect() as conn:
+        row = conn.execute("SELECT data FROM checkpoints WHERE job_id = ? AND stage = ?", (job_id, stage)).fetchone()
+    return row[0] if row else None
+
+
+def save_checkpoint(job_id: str, stage: str, data: str) -> None:
+    with connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (job_id, stage, data) VALUES (?, ?, ?)", (job_id, stage, data)
+        )
+
+
+class JobCheckpoints:
+    """The checkpoints of one job, in the form ResearchManager expects"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    def load(self, stage: str) -> str | None:
+        return load_checkpoint(self.job_id, stage)
+
+    def save(self, stage: str, data: str) -> None:
+        save_checkpoint(self.job_id, stage, data)
+
+
+def job_status(job_id: str) -> dict | None:
+    """The job's state, latest status message, completed stages, and the report once it is written"""
+    with connect() as conn:
+        row = conn.execute(
+            "SELECT id, query, status, message, error, attempts, created, updated FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        stages = [stage for (stage,) in conn.execute("SELECT stage FROM checkpoints WHERE job_id = ?", (job_id,))]
+    keys = ["id", "query", "status", "message", "error", "attempts", "created", "updated"]
+    status = dict(zip(keys, row))
+    status["stages"] = stages
+    report = load_checkpoint(job_id, "report")
+    status["report"] = ReportData.model_validate_json(report).markdown_report if report else None
+    return status
+
+
+def list_jobs(status: str | None = None, limit: int = 50) -> list[dict]:
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT id, query, status, message, attempts, updated FROM jobs WHERE COALESCE(?, status) = status "
+            "ORDER BY created DESC LIMIT ?",
+            (status, limit),
+        ).fetchall()
+    keys = ["id", "query", "status", "message", "attempts", "updated"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def job_counts() -> dict[str, int]:
+    with connect() as conn:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+async def keep_lease(job_id: str) -> None:
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        renew(job_id)
+
+
+async def run_job(job_id: str, query: str, streaming: bool) -> None:
+    """Run the research pipeline for a job, recording each status update, resuming from its checkpoints"""
+    print(f"Starting job {job_id}: {query}")
+    manager = ResearchManager(checkpoints=JobCheckpoints(job_id))
+    heartbeat = asyncio.create_task(keep_lease(job_id))
+    status, pending = None, None
+    try:
+        async for update in manager.run(query, streaming=streaming):
+            # The last update is the report itself, which the status API serves from its checkpoint
+            if pending is not None:
+                status = pending
+                renew(job_id, status)
+            pending = update
+        finish(job_id, status)
+        print(f"Finished job {job_id}")
+    except Exception as e:
+        print(f"Job {job_id} failed: {e}")
+        fail(job_id, str(e))
+    finally:
+        heartbeat.cancel()
+
+
+async def run_workers(
+    workers: int = MAX_CONCURRENT_JOBS, max_concurrent: int = MAX_CONCURRENT_JOBS, until_empty: bool = False
+) -> None:
+    """
+    Run jobs from the queue on a pool of workers, within the global budget of max_concurrent running jobs.
+    With until_empty, return once no jobs are left queued or running, otherwise keep polling for new ones.
+    """
+
+    async def worker():
+        while True:
+            job = claim(max_concurrent)
+            if job:
+                await run_job(*job)
+                continue
+            counts = job_counts()
+            if until_empty and not counts.get("queued") and not counts.get("running"):
+                return
+            await asyncio.sleep(POLL_SECONDS)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue deep research jobs and run them on a pool of workers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit_parser = commands.add_parser("submit", help="Queue queries given as arguments, or one per line of a file")
+    submit_parser.add_argument("queries", nargs="*")
+    submit_parser.add_argument("--file", help="A file with one research query per line")
+    submit_parser.add_argument("--streaming", action="store_true", help="Write sections as search results arrive")
+    work_parser = commands.add_parser("work", help="Run queued jobs")
+    work_parser.add_argument("--workers", type=int, default=MAX_CONCURRENT_JOBS)
+    work_parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT_JOBS)
+    work_parser.add_argument("--until-empty", action="store_true", help="Stop once the queue is drained")
+    status_parser = commands.add_parser("status", help="Show a job, or the most recent jobs")
+    status_parser.add_argument("job_id", nargs="?")
+    status_parser.add_argument("--status", choices=["queued", "running", "done", "failed"])
+    status_parser.add_argument("--limit", type=int, default=50)
+    retry_parser = commands.add_parser("retry", help="Requeue failed jobs")
+    retry_parser.add_argument("job_ids", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "submit":
+        queries = list(args.queries)
+        if args.file:
+            with open(args.file, encoding="utf-8") as f:
+                queries += [line.strip() for line in f if line.strip()]
+        for job_id, query in zip(submit_many(queries, args.streaming), queries):
+            print(f"{job_id}  {query}")
+    elif args.command == "work":
+        asyncio.run(run_workers(args.workers, args.max_concurrent, args.until_empty))
+    elif args.command == "status" and args.job_id:
+        status = job_status(args.job_id)
+        if status is None:
+            raise SystemExit(f"No job {args.job_id}")
+        for key, value in status.items():
+            if key != "report":
+                print(f"{key}: {value}")
+        if status["report"]:
+            print(f"\n{status['report']}")
+    elif args.command == "status":
+        print(job_counts())
+        for job in list_jobs(args.status, args.limit):
+            print(f"{job['id']}  {job['status']:<8} {job['query'][:60]:<60}  {job['message'].splitlines()[0][:80]}")
+    elif args.command == "retry":
+        for job_id in args.job_ids:
+            print(f"{job_id}: {'requeued' if retry(job_id) else 'not failed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,122 @@
 from agents import Runner, trace, gen_trace_id
 from search_agent import search_agent
 from planner_agent import planner_agent, WebSearchItem, WebSearchPlan
-from writer_agent import writer_agent, ReportData
+from writer_agent import (
+    writer_agent,
+    outline_agent,
+    section_agent,
+    summary_agent,
+    ReportData,
+    ReportOutline,
+    ReportSection,
+    ReportSummary,
+)
 from email_agent import email_agent
+from rate_limiter import limiter_for, limiter_stats
+from search_cache import search_cache
+from pydantic import TypeAdapter
+from dotenv import load_dotenv
 import asyncio
+import os
+import time
+
+load_dotenv(override=True)
+
+# In streaming mode the report goes ahead once SEARCH_QUORUM searches have succeeded, or once
+# SEARCH_DEADLINE_SECONDS have passed, abandoning the slower searches; 0 means wait for all of them
+
+SEARCH_QUORUM = int(os.getenv("SEARCH_QUORUM", "0"))
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "0"))
+
 
 class ResearchManager:
 
-    async def run(self, query: str):
+    def __init__(
+        self,
+        quorum: int = SEARCH_QUORUM,
+        deadline_seconds: float = SEARCH_DEADLINE_SECONDS,
+        checkpoints=None,
+    ):
+        """
+        checkpoints, if given, stores the result of each stage of a run so that a rerun resumes after
+        the last completed stage: an object with load(stage) returning the saved JSON or None, and save(stage, json)
+        """
+        self.quorum = quorum
+        self.deadline_seconds = deadline_seconds
+        self.checkpoints = checkpoints
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def run(self, query: str, streaming: bool = False):
         """ Run the deep research process, yielding the status updates and the final report"""
+        start = time.perf_counter()
+        rate_limits_before = limiter_stats()
         trace_id = gen_trace_id()
         with trace("Research trace", trace_id=trace_id):
             print(f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}")
             yield f"View trace: https://platform.openai.com/traces/trace?trace_id={trace_id}"
             print("Starting research...")
-            search_plan = await self.plan_searches(query)
-            yield "Searches planned, starting to search..."     
-            search_results = await self.perform_searches(search_plan)
-            yield "Searches complete, writing report..."
-            report = await self.write_report(query, search_results)
-            yield "Report written, sending email..."
-            await self.send_email(report)
-            yield "Email sent, research complete"
+            report = self.load_checkpoint("report", ReportData)
+            if report is None:
+                search_plan = self.load_checkpoint("plan", WebSearchPlan)
+                if search_plan is None:
+                    search_plan = await self.plan_searches(query)
+                    self.save_checkpoint("plan", WebSearchPlan, search_plan)
+                yield "Searches planned, starting to search..."
+                if streaming:
+                    async for update in self.stream_report(query, search_plan, start):
+                        if isinstance(update, ReportData):
+                            report = update
+                        else:
+                            yield update
+                else:
+                    search_results = await self.perform_searches(search_plan)
+                    yield f"Searches complete ({self.cache_summary()}), writing report..."
+                    report = await self.write_report(query, search_results)
+                self.save_checkpoint("report", ReportData, report)
+            if not self.load_checkpoint("email", bool):
+                yield f"Report written after {time.perf_counter() - start:.1f}s, sending email..."
+                await self.send_email(report)
+                self.save_checkpoint("email", bool, True)
+            status = f"Email sent, research complete in {time.perf_counter() - start:.1f}s, {self.cache_summary()}"
+            rate_limits = self.rate_limit_summary(rate_limits_before)
+            yield f"{status} (rate limits: {rate_limits})" if rate_limits else status
             yield report.markdown_report
-        
+
+    def load_checkpoint(self, stage: str, type_):
+        """ The checkpointed result of the stage, or None if it has not completed """
+        saved = self.checkpoints.load(stage) if self.checkpoints is not None else None
+        if saved is None:
+            return None
+        print(f"Resuming from the {stage} checkpoint")
+        return TypeAdapter(type_).validate_json(saved)
+
+    def save_checkpoint(self, stage: str, type_, value) -> None:
+        if self.checkpoints is not None:
+            self.checkpoints.save(stage, TypeAdapter(type_).dump_json(value).decode())
+
+    async def run_agent(self, agent, input: str):
+        """ Run an agent within the rate limits of its model, or of web search if it searches """
+        return await limiter_for(agent).run(lambda: Runner.run(agent, input))
+
+    def rate_limit_summary(self, before: dict[str, dict]) -> str:
+        """ Calls throttled and retried by each limiter since the before snapshot """
+        parts = []
+        for key, stats in limiter_stats().items():
+            previous = before.get(key, {})
+            throttled = stats["throttled"] - previous.get("throttled", 0)
+            retried = stats["retried"] - previous.get("retried", 0)
+            if throttled or retried:
+                parts.append(f"{key}: {throttled} throttled, {retried} retried")
+        return "; ".join(parts)
+
+    def cache_summary(self) -> str:
+        return f"search cache: {self.cache_hits} hits, {self.cache_misses} misses"
 
     async def plan_searches(self, query: str) -> WebSearchPlan:
         """ Plan the searches to perform for the query """
         print("Planning searches...")
-        result = await Runner.run(
-            planner_agent,
-            f"Query: {query}",
-        )
+        result = await self.run_agent(planner_agent, f"Query: {query}")
         print(f"Will perform {len(result.final_output.searches)} searches")
         return result.final_output_as(WebSearchPlan)
 
@@ -39,7 +124,7 @@ class ResearchManager:
         """ Perform the searches to perform for the query """
         print("Searching...")
         num_completed = 0
-        tasks = [asyncio.create_task(self.search(item)) for item in search_plan.searches]
+        tasks = [asyncio.create_task(self.checkpointed_search(i, item)) for i, item in enumerate(search_plan.searches)]
         results = []
         for task in asyncio.as_completed(tasks):
             result = await task
@@ -50,35 +135,180 @@ class ResearchManager:
         print("Finished searching")
         return results
 
+    async def stream_searches(self, tasks: list[asyncio.Task]):
+        """
+        Yield (index, summary) for each search as it settles, with None for a failed search.
+        Once the quorum of successful searches is reached or the deadline passes, the searches
+        still running are cancelled and yielded with None.
+        """
+        index_of = {task: index for index, task in enumerate(tasks)}
+        deadline = time.perf_counter() + self.deadline_seconds if self.deadline_seconds else None
+        pending = set(tasks)
+        succeeded = 0
+        while pending:
+            if self.quorum and succeeded >= self.quorum:
+                break
+            timeout = max(0.0, deadline - time.perf_counter()) if deadline else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                result = task.result()
+                succeeded += result is not None
+                yield index_of[task], result
+        if pending:
+            print(f"Going ahead without {len(pending)} slower searches")
+        for task in pending:
+            task.cancel()
+            yield index_of[task], None
+
+    async def plan_outline(self, query: str, search_plan: WebSearchPlan) -> ReportOutline:
+        """ Outline the report from the planned searches, before their results are in """
+        searches = "\n".join(f"{i}. {item.query} ({item.reason})" for i, item in enumerate(search_plan.searches))
+        result = await self.run_agent(outline_agent, f"Original query: {query}\nSearches:\n{searches}")
+        return result.final_output_as(ReportOutline)
+
+    async def write_section(
+        self, query: str, outline: ReportOutline, section: ReportSection, search_results: list[str]
+    ) -> str:
+        """ Write one section of the report from the search results it draws on """
+        headings = "\n".join(f"- {s.heading}: {s.focus}" for s in outline.sections)
+        input = (
+            f"Original query: {query}\nOutline:\n{headings}\n"
+            f"Section to write: {section.heading}: {section.focus}\nSummarized search results: {search_results}"
+        )
+        result = await self.run_agent(section_agent, input)
+        return f"## {section.heading}\n\n{result.final_output}"
+
+    async def stream_report(self, query: str, search_plan: WebSearchPlan, start: float):
+        """
+        Write the report incrementally, yielding status updates with the report so far, then the ReportData.
+        The outline is drafted while the searches run, and each section is written as soon as every search
+        it draws on has settled, so the report no longer waits on the slowest search.
+        """
+        tasks = [asyncio.create_task(self.checkpointed_search(i, item)) for i, item in enumerate(search_plan.searches)]
+        feeder = None
+        section_tasks = []
+        try:
+            outline = await self.plan_outline(query, search_plan)
+            yield f"Outline ready with {len(outline.sections)} sections, searching..."
+            all_sources = set(range(len(tasks)))
+            needs = [set(section.sources) & all_sources or all_sources for section in outline.sections]
+            events = asyncio.Queue()
+            results: dict[int, str | None] = {}
+            started: set[int] = set()
+            written: dict[int, str] = {}
+            first_section_seconds = None
+
+            async def feed_searches():
+                try:
+                    async for index, result in self.stream_searches(tasks):
+                        await events.put(("search", index, result))
+                except Exception as e:
+                    await events.put(("error", None, e))
+
+            async def write_section(i: int):
+                search_results = [results[j] for j in sorted(needs[i]) if results[j]]
+                try:
+                    text = await self.write_section(query, outline, outline.sections[i], search_results)
+                    await events.put(("section", i, text))
+                except Exception as e:
+                    await events.put(("error", i, e))
+
+            feeder = asyncio.create_task(feed_searches())
+            while len(written) < len(needs):
+                kind, index, text = await events.get()
+                if kind == "error":
+                    raise text
+                if kind == "search":
+                    results[index] = text
+                    for i in range(len(needs)):
+                        if i not in started and needs[i] <= results.keys():
+                            started.add(i)
+                            section_tasks.append(asyncio.create_task(write_section(i)))
+                    yield (
+                        f"Searches {len(results)}/{len(tasks)} settled ({self.cache_summary()}), "
+                        f"{len(written)}/{len(needs)} sections written"
+                    )
+                else:
+                    written[index] = text
+                    if first_section_seconds is None:
+                        first_section_seconds = time.perf_counter() - start
+                    draft = "\n\n".join(written[i] for i in sorted(written))
+                    yield (
+                        f"{len(written)}/{len(needs)} sections written, first after {first_section_seconds:.1f}s\n\n"
+                        f"# {outline.title}\n\n{draft}"
+                    )
+            await feeder
+            for task in section_tasks:
+                await task
+            markdown_report = f"# {outline.title}\n\n" + "\n\n".join(written[i] for i in range(len(needs)))
+            result = await self.run_agent(summary_agent, markdown_report)
+            summary = result.final_output_as(ReportSummary)
+            yield ReportData(
+                short_summary=summary.short_summary,
+                markdown_report=markdown_report,
+                follow_up_questions=summary.follow_up_questions,
+            )
+        finally:
+            # If the outline or a section failed, or the caller stopped listening, stop the work still running
+            running = [task for task in [*tasks, *section_tasks, feeder] if task is not None and not task.done()]
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def checkpointed_search(self, index: int, item: WebSearchItem) -> str | None:
+        """ The checkpointed summary of the plan's index-th search, or a fresh search checkpointed if it succeeds """
+        stage = f"search_{index}"
+        summary = self.load_checkpoint(stage, str)
+        if summary is None:
+            summary = await self.search(item)
+            if summary is not None:
+                self.save_checkpoint(stage, str, summary)
+        return summary
+
     async def search(self, item: WebSearchItem) -> str | None:
-        """ Perform a search for the query """
+        """
+        Perform a search for the query, unless a summary for the same or a similar term is cached.
+        The cache only ever saves work: if the lookup fails, the search goes ahead as a miss and its summary
+        is not stored, and if only storing fails, the summary is still returned.
+        """
+        cache_available = True
+        try:
+            summary, embedding = await search_cache.lookup(item.query)
+        except Exception as e:
+            print(f"Search cache lookup for {item.query} failed, searching anyway: {e}")
+            summary, embedding, cache_available = None, None, False
+        if summary is not None:
+            self.cache_hits += 1
+            return summary
+        self.cache_misses += 1
         input = f"Search term: {item.query}\nReason for searching: {item.reason}"
         try:
-            result = await Runner.run(
-                search_agent,
-                input,
-            )
-            return str(result.final_output)
-        except Exception:
+            result = await self.run_agent(search_agent, input)
+        except Exception as e:
+            print(f"Search for {item.query} failed: {e}")
             return None
+        summary = str(result.final_output)
+        if not cache_available:
+            return summary
+        try:
+            search_cache.store(item.query, summary, embedding)
+        except Exception as e:
+            print(f"Could not cache the summary for {item.query}: {e}")
+        return summary
 
     async def write_report(self, query: str, search_results: list[str]) -> ReportData:
         """ Write the report for the query """
         print("Thinking about report...")
         input = f"Original query: {query}\nSummarized search results: {search_results}"
-        result = await Runner.run(
-            writer_agent,
-            input,
-        )
+        result = await self.run_agent(writer_agent, input)
 
         print("Finished writing report")
         return result.final_output_as(ReportData)
-    
+
     async def send_email(self, report: ReportData) -> None:
         print("Writing email...")
-        result = await Runner.run(
-            email_agent,
-            report.markdown_report,
-        )
+        result = await self.run_agent(email_agent, report.markdown_report)
         print("Email sent")
-        return report
\ No newline at end of file
+        return report
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from research_manager import ResearchManager
+from planner_agent import WebSearchPlan
+from writer_agent import ReportData
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+RUNS_DIR = os.getenv("RESEARCH_RUNS_DIR", "research_runs")
+
+
+def run_id_for(query: str, fresh: bool = False) -> str:
+    """
+    Runs are named by the hash of their normalized query, so rerunning a query resumes its run.
+    A fresh run also carries the time it started, so it researches the query again from the start.
+    """
+    run_id = hashlib.sha256(" ".join(query.casefold().split()).encode()).hexdigest()[:16]
+    return f"{run_id}-{time.strftime('%Y%m%d%H%M%S')}" if fresh else run_id
+
+
+def write_atomically(path: str, data: bytes) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class RunCheckpoints:
+    """
+    The checkpoints of one research run, kept in its directory under RUNS_DIR. Each stage's result is stored once
+    under the hash of its content, and manifest.json records the query and the digest of each completed stage.
+    """
+
+    def __init__(self, run_id: str, query: str | None = None, streaming: bool = False):
+        self.run_id = run_id
+        self.directory = os.path.join(RUNS_DIR, run_id)
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        elif query is None:
+            raise ValueError(f"No run {run_id} in {RUNS_DIR}")
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            now = time.time()
+            self.manifest = {"query": query, "streaming": streaming, "created": now, "updated": now, "stages": {}}
+            self.write_manifest()
+
+    @property
+    def query(self) -> str:
+        return self.manifest["query"]
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def write_manifest(self) -> None:
+        write_atomically(self.manifest_path, json.dumps(self.manifest, indent=2).encode("utf-8"))
+
+    def load(self, stage: str) -> str | None:
+        digest = self.manifest["stages"].get(stage)
+        if digest is None:
+            return None
+        try:
+            with open(self.object_path(digest), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, stage: str, data: str) -> None:
+        encoded = data.encode("utf-8")
+        digest = hashlib.sha256(encoded).hexdigest()
+        if not os.path.exists(self.object_path(digest)):
+            write_atomically(self.object_path(digest), encoded)
+        self.manifest["stages"][stage] = digest
+        self.manifest["updated"] = time.time()
+        self.write_manifest()
+
+    def is_complete(self) -> bool:
+        return "email" in self.manifest["stages"]
+
+
+def list_runs() -> list[RunCheckpoints]:
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    runs = [
+        RunCheckpoints(run_id)
+        for run_id in os.listdir(RUNS_DIR)
+        if os.path.exists(os.path.join(RUNS_DIR, run_id, "manifest.json"))
+    ]
+    return sorted(runs, key=lambda run: run.manifest["updated"], reverse=True)
+
+
+async def resume(run: RunCheckpoints) -> None:
+    """Run the research for the run's query, skipping the stages it has already completed"""
+    manager = ResearchManager(checkpoints=run)
+    async for update in manager.run(run.query, streaming=run.manifest["streaming"]):
+        print(update)
+
+
+def show(run: RunCheckpoints) -> None:
+    print(f"Run {run.run_id}: {run.query}")
+    print(f"Status: {'complete' if run.is_complete() else 'partial'}, updated {time.ctime(run.manifest['updated'])}")
+    plan = run.load("plan")
+    if plan is None:
+        print("Not yet planned")
+        return
+    searches = WebSearchPlan.model_validate_json(plan).searches
+    for i, item in enumerate(searches):
+        summary = run.load(f"search_{i}")
+        state = f"{len(json.loads(summary))} chars" if summary else "not done"
+        print(f"  Search {i}: {item.query} ({state})")
+    report = run.load("report")
+    if report:
+        print(f"\n{ReportData.model_validate_json(report).markdown_report}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List, inspect and resume checkpointed deep research runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="List runs, most recent first")
+    list_parser.add_argument("--partial", action="store_true", help="Only runs that have not completed")
+    show_parser = commands.add_parser("show", help="Show a run's plan, searches and report")
+    show_parser.add_argument("run_id")
+    resume_parser = commands.add_parser("resume", help="Resume a run from its last completed stage")
+    resume_parser.add_argument("run_id")
+    run_parser = commands.add_parser("run", help="Research a query, resuming its run if it has one")
+    run_parser.add_argument("query")
+    run_parser.add_argument("--run-id", help="Defaults to the hash of the query")
+    run_parser.add_argument(
+        "--fresh", action="store_true", help="Start a new run even if this query has already been researched"
+    )
+    run_parser.add_argument("--streaming", action="store_true", help="Write sections as search results arrive")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for run in list_runs():
+            if args.partial and run.is_complete():
+                continue
+            status = "complete" if run.is_complete() else "partial"
+            stages = len(run.manifest["stages"])
+            print(f"{run.run_id}  {status:<8} {stages:>2} stages  {time.ctime(run.manifest['updated'])}  {run.query[:60]}")
+    elif args.command == "show":
+        show(RunCheckpoints(args.run_id))
+    elif args.command == "resume":
+        asyncio.run(resume(RunCheckpoints(args.run_id)))
+    elif args.command == "run":
+        run = RunCheckpoints(args.run_id or run_id_for(args.query, args.fresh), args.query, args.streaming)
+        if run.is_complete():
+            print(
+                f"Run {run.run_id} for this query completed on {time.ctime(run.manifest['updated'])}; "
+                "showing its report without researching or emailing again. Use --fresh to research it again.\n"
+            )
+            show(run)
+        else:
+            if run.manifest["stages"]:
+                print(f"Resuming run {run.run_id} after {len(run.manifest['stages'])} completed stages")
+            asyncio.run(resume(run))
+
+
+if __name__ == "__main__":
+    main()
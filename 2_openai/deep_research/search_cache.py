@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from openai import AsyncOpenAI
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+DB = os.getenv("SEARCH_CACHE_DB", "search_cache.db")
+EMBEDDING_MODEL = "text-embedding-3-small"
+TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24")) * 3600
+SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_CACHE_SIMILARITY", "0.92"))
+
+
+def normalize_term(term: str) -> str:
+    return " ".join(term.casefold().split())
+
+
+class SearchCache:
+    """
+    Search summaries stored in SQLite with the embedding of their search term. A term is answered from the
+    cache if a fresh entry has the same normalized term, or failing that an embedding whose cosine similarity
+    to the term's is at least the threshold. Entries older than the TTL are ignored and pruned.
+    """
+
+    def __init__(self, db: str = DB, ttl_seconds: float = TTL_SECONDS, threshold: float = SIMILARITY_THRESHOLD):
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.client = None
+        self.db = db
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """
+        This thread's connection, opened on first use. sqlite3 connections can't be shared between threads,
+        and the cache is used from the UI's worker thread as well as the thread that imported it.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit, so pruning in lookup doesn't hold the write lock while the search agent runs
+            conn = sqlite3.connect(self.db, isolation_level=None, timeout=30)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    term TEXT,
+                    normalized TEXT,
+                    embedding BLOB,
+                    summary TEXT,
+                    created REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS summaries_normalized ON summaries (normalized)")
+            conn.execute("CREATE INDEX IF NOT EXISTS summaries_created ON summaries (created)")
+            self._local.conn = conn
+        return conn
+
+    async def embed(self, text: str) -> np.ndarray | None:
+        """The unit-length embedding of the text, or None if the embeddings call fails"""
+        if self.client is None:
+            self.client = AsyncOpenAI()
+        try:
+            response = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+        except Exception as e:
+            print(f"Could not embed search term, using exact matches only: {e}")
+            return None
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    async def lookup(self, term: str) -> tuple[str | None, np.ndarray | None]:
+        """
+        Return (summary, embedding): the cached summary for the term or None on a miss,
+        and the term's embedding if one was computed, to be reused when storing the new summary
+        """
+        oldest = time.time() - self.ttl_seconds
+        self.conn.execute("DELETE FROM summaries WHERE created < ?", (oldest,))
+        row = self.conn.execute(
+            "SELECT summary FROM summaries WHERE normalized = ? ORDER BY created DESC LIMIT 1",
+            (normalize_term(term),),
+        ).fetchone()
+        if row:
+            return row[0], None
+        embedding = await self.embed(term)
+        if embedding is None:
+            return None, None
+        rows = self.conn.execute("SELECT embedding, summary FROM summaries WHERE embedding IS NOT NULL").fetchall()
+        if not rows:
+            return None, embedding
+        matrix = np.frombuffer(b"".join(blob for blob, _ in rows), dtype=np.float32).reshape(len(rows), -1)
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return rows[best][1], embedding
+        return None, embedding
+
+    def store(self, term: str, summary: str, embedding: np.ndarray | None) -> None:
+        self.conn.execute(
+            "INSERT INTO summaries (term, normalized, embedding, summary, created) VALUES (?, ?, ?, ?, ?)",
+            (
+                term,
+                normalize_term(term),
+                embedding.astype(np.float32).tobytes() if embedding is not None else None,
+                summary,
+                time.time(),
+            ),
+        )
+
+
+search_cache = SearchCache()
@@ -22,4 +22,64 @@ writer_agent = Agent(
     instructions=INSTRUCTIONS,
     model="gpt-4o-mini",
     output_type=ReportData,
-)
\ No newline at end of file
+)
+
+
+# Incremental writing: an outline is drafted while the searches run, then each section is written
+# as soon as the searches it draws on are in, and a short summary is produced from the finished sections
+
+OUTLINE_INSTRUCTIONS = (
+    "You are a senior researcher planning a report for a research query. "
+    "You will be given the query and the numbered list of web searches being run for it, but not their results yet. "
+    "Plan the report as a title and 4-8 sections in reading order. For each section give a heading, what it should cover, "
+    "and the numbers of the searches whose results it should draw on. Use an empty list for sections, such as an "
+    "introduction or conclusion, that should draw on all of the results."
+)
+
+SECTION_INSTRUCTIONS = (
+    "You are a senior researcher writing one section of a cohesive report. You will be given the research query, "
+    "the report outline, the section to write and summarized search results for it. Write only that section, "
+    "in markdown without its heading, detailed and at least 200 words. Do not repeat material that belongs to other sections."
+)
+
+SUMMARY_INSTRUCTIONS = (
+    "You will be given a finished research report. Write a short 2-3 sentence summary of its findings "
+    "and suggest topics to research further."
+)
+
+
+class ReportSection(BaseModel):
+    heading: str = Field(description="The section heading")
+    focus: str = Field(description="What the section should cover")
+    sources: list[int] = Field(description="Numbers of the searches to draw on, or empty to draw on all of them")
+
+
+class ReportOutline(BaseModel):
+    title: str = Field(description="The report title")
+    sections: list[ReportSection] = Field(description="The sections of the report in reading order")
+
+
+class ReportSummary(BaseModel):
+    short_summary: str = Field(description="A short 2-3 sentence summary of the findings.")
+    follow_up_questions: list[str] = Field(description="Suggested topics to research further")
+
+
+outline_agent = Agent(
+    name="OutlineAgent",
+    instructions=OUTLINE_INSTRUCTIONS,
+    model="gpt-4o-mini",
+    output_type=ReportOutline,
+)
+
+section_agent = Agent(
+    name="SectionAgent",
+    instructions=SECTION_INSTRUCTIONS,
+    model="gpt-4o-mini",
+)
+
+summary_agent = Agent(
+    name="SummaryAgent",
+    instructions=SUMMARY_INSTRUCTIONS,
+    model="gpt-4o-mini",
+    output_type=ReportSummary,
+)
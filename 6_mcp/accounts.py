@@ -1,14 +1,26 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 import json
 from dotenv import load_dotenv
 from datetime import datetime
-from market import get_share_price
-from database import write_account, read_account, write_log
+from market import get_share_price, get_share_prices
+from database import (
+    write_account,
+    read_account,
+    write_log,
+    read_transactions,
+    read_recent_transactions,
+    read_portfolio_series,
+    write_portfolio_snapshot,
+    read_portfolio_snapshots,
+    AccountVersionConflict,
+)
 
 load_dotenv(override=True)
 
 INITIAL_BALANCE = 10_000.0
 SPREAD = 0.002
+REPORT_TRANSACTIONS = 20
+REPORT_SERIES_POINTS = 50
 
 
 class Transaction(BaseModel):
@@ -30,11 +42,16 @@ class Account(BaseModel):
     balance: float
     strategy: str
     holdings: dict[str, int]
-    transactions: list[Transaction]
-    portfolio_value_time_series: list[tuple[str, float]]
+    average_costs: dict[str, float] = {}
+    net_invested: float | None = None
+    realized_pnl: float = 0.0
+    version: int = 0
+    _transactions: list[Transaction] | None = PrivateAttr(default=None)
+    _portfolio_value_time_series: list[tuple[str, float]] | None = PrivateAttr(default=None)
 
     @classmethod
     def get(cls, name: str):
+        """ Load the account; transactions and the time series are only read from the database when used. """
         fields = read_account(name.lower())
         if not fields:
             fields = {
@@ -42,23 +59,97 @@ class Account(BaseModel):
                 "balance": INITIAL_BALANCE,
                 "strategy": "",
                 "holdings": {},
-                "transactions": [],
-                "portfolio_value_time_series": []
+                "net_invested": 0.0,
+                "version": 0,
             }
-            write_account(name, fields)
-        return cls(**fields)
-    
-    
-    def save(self):
-        write_account(self.name.lower(), self.model_dump())
+            try:
+                write_account(name, fields)
+            except AccountVersionConflict:
+                pass
+            fields = read_account(name.lower())
+        account = cls(**fields)
+        if account.net_invested is None:
+            account.rebuild_aggregates()
+        return account
+
+    @property
+    def transactions(self) -> list[Transaction]:
+        if self._transactions is None:
+            self._transactions = [Transaction(**fields) for fields in read_transactions(self.name)]
+        return self._transactions
+
+    @property
+    def portfolio_value_time_series(self) -> list[tuple[str, float]]:
+        if self._portfolio_value_time_series is None:
+            self._portfolio_value_time_series = [tuple(row) for row in read_portfolio_snapshots(self.name)]
+        return self._portfolio_value_time_series
+
+    def share_price(self, symbol: str) -> float:
+        return get_share_price(symbol)
+
+    def share_prices(self, symbols: list[str]) -> dict[str, float]:
+        return get_share_prices(symbols)
+
+    def now(self) -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def log(self, message: str):
+        write_log(self.name, "account", message)
+
+    def save(self, transaction: Transaction | None = None, clear_history: bool = False):
+        """
+        Save the balance, strategy and holdings, appending the new transaction if there is one,
+        or first deleting all history if clear_history is set.
+        Raises AccountVersionConflict if the account was saved by someone else since it was loaded.
+        """
+        if transaction:
+            self.version = write_account(self.name.lower(), self.model_dump(), transaction.model_dump())
+            if self._transactions is not None:
+                self._transactions.append(transaction)
+        else:
+            self.version = write_account(self.name.lower(), self.model_dump(), clear_history=clear_history)
+
+    def update_aggregates(self, transaction: Transaction, position_before: int):
+        """ Fold one transaction into the running cost basis and P&L, given the position held before it. """
+        self.net_invested += transaction.total()
+        symbol = transaction.symbol
+        average_cost = self.average_costs.get(symbol, 0.0)
+        position_after = position_before + transaction.quantity
+        if transaction.quantity > 0:
+            self.average_costs[symbol] = (position_before * average_cost + transaction.total()) / position_after
+        else:
+            self.realized_pnl += -transaction.quantity * (transaction.price - average_cost)
+            if position_after <= 0:
+                self.average_costs.pop(symbol, None)
+
+    def rebuild_aggregates(self):
+        """ Recompute the cost basis and P&L aggregates by replaying every transaction, then save them. """
+        self.net_invested = 0.0
+        self.realized_pnl = 0.0
+        self.average_costs = {}
+        positions = {}
+        for transaction in self.transactions:
+            position_before = positions.get(transaction.symbol, 0)
+            self.update_aggregates(transaction, position_before)
+            positions[transaction.symbol] = position_before + transaction.quantity
+        self.save()
+
+    def add_portfolio_value(self, timestamp: str, value: float):
+        """ Append a point to the portfolio value time series. """
+        if self._portfolio_value_time_series is not None:
+            self._portfolio_value_time_series.append((timestamp, value))
+        write_portfolio_snapshot(self.name, timestamp, value)
 
     def reset(self, strategy: str):
         self.balance = INITIAL_BALANCE
         self.strategy = strategy
         self.holdings = {}
-        self.transactions = []
-        self.portfolio_value_time_series = []
-        self.save()
+        self.average_costs = {}
+        self.net_invested = 0.0
+        self.realized_pnl = 0.0
+        self._transactions = []
+        self._portfolio_value_time_series = []
+        self.save(clear_history=True)
 
     def deposit(self, amount: float):
         """ Deposit funds into the account. """
@@ -78,7 +169,7 @@ class Account(BaseModel):
 
     def buy_shares(self, symbol: str, quantity: int, rationale: str) -> str:
         """ Buy shares of a stock if sufficient funds are available. """
-        price = get_share_price(symbol)
+        price = self.share_price(symbol)
         buy_price = price * (1 + SPREAD)
         total_cost = buy_price * quantity
         
@@ -87,56 +178,71 @@ class Account(BaseModel):
         elif price==0:
             raise ValueError(f"Unrecognized symbol {symbol}")
         
-        # Update holdings
-        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = self.now()
         # Record transaction
         transaction = Transaction(symbol=symbol, quantity=quantity, price=buy_price, timestamp=timestamp, rationale=rationale)
-        self.transactions.append(transaction)
+        self.update_aggregates(transaction, self.holdings.get(symbol, 0))
+
+        # Update holdings
+        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
         
         # Update balance
         self.balance -= total_cost
-        self.save()
-        write_log(self.name, "account", f"Bought {quantity} of {symbol}")
-        return "Completed. Latest details:\n" + self.report()
+        self.save(transaction)
+        self.log(f"Bought {quantity} of {symbol}")
+        return self.confirmation(transaction)
 
     def sell_shares(self, symbol: str, quantity: int, rationale: str) -> str:
         """ Sell shares of a stock if the user has enough shares. """
         if self.holdings.get(symbol, 0) < quantity:
             raise ValueError(f"Cannot sell {quantity} shares of {symbol}. Not enough shares held.")
         
-        price = get_share_price(symbol)
+        price = self.share_price(symbol)
         sell_price = price * (1 - SPREAD)
         total_proceeds = sell_price * quantity
         
+        timestamp = self.now()
+        # Record transaction
+        transaction = Transaction(symbol=symbol, quantity=-quantity, price=sell_price, timestamp=timestamp, rationale=rationale)  # negative quantity for sell
+        self.update_aggregates(transaction, self.holdings[symbol])
+
         # Update holdings
         self.holdings[symbol] -= quantity
         
         # If shares are completely sold, remove from holdings
         if self.holdings[symbol] == 0:
             del self.holdings[symbol]
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        # Record transaction
-        transaction = Transaction(symbol=symbol, quantity=-quantity, price=sell_price, timestamp=timestamp, rationale=rationale)  # negative quantity for sell
-        self.transactions.append(transaction)
 
         # Update balance
         self.balance += total_proceeds
-        self.save()
-        write_log(self.name, "account", f"Sold {quantity} of {symbol}")
-        return "Completed. Latest details:\n" + self.report()
+        self.save(transaction)
+        self.log(f"Sold {quantity} of {symbol}")
+        return self.confirmation(transaction)
+
+    def confirmation(self, transaction: Transaction) -> str:
+        """ A compact json confirmation of a trade: the fill, and the cash and position after it. """
+        return json.dumps({
+            "status": "filled",
+            "side": "buy" if transaction.quantity > 0 else "sell",
+            "symbol": transaction.symbol,
+            "quantity": abs(transaction.quantity),
+            "fill_price": round(transaction.price, 4),
+            "total": round(abs(transaction.total()), 2),
+            "cash": round(self.balance, 2),
+            "position": self.holdings.get(transaction.symbol, 0),
+        })
 
     def calculate_portfolio_value(self):
         """ Calculate the total value of the user's portfolio. """
         total_value = self.balance
+        prices = self.share_prices(list(self.holdings))
         for symbol, quantity in self.holdings.items():
-            total_value += get_share_price(symbol) * quantity
+            total_value += prices[symbol] * quantity
         return total_value
 
     def calculate_profit_loss(self, portfolio_value: float):
         """ Calculate profit or loss from the initial spend. """
-        initial_spend = sum(transaction.total() for transaction in self.transactions)
-        return portfolio_value - initial_spend - self.balance
+        return portfolio_value - self.net_invested - self.balance
 
     def get_holdings(self):
         """ Report the current holdings of the user. """
@@ -144,34 +250,47 @@ class Account(BaseModel):
 
     def get_profit_loss(self):
         """ Report the user's profit or loss at any point in time. """
-        return self.calculate_profit_loss()
+        return self.calculate_profit_loss(self.calculate_portfolio_value())
 
     def list_transactions(self):
         """ List all transactions made by the user. """
         return [transaction.model_dump() for transaction in self.transactions]
     
     def report(self) -> str:
-        """ Return a json string representing the account.  """
+        """
+        Return a json string representing the account, with only its latest transactions
+        and its portfolio value history at a resolution of at most REPORT_SERIES_POINTS points.
+        """
         portfolio_value = self.calculate_portfolio_value()
-        self.portfolio_value_time_series.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value))
-        self.save()
+        self.add_portfolio_value(self.now(), portfolio_value)
         pnl = self.calculate_profit_loss(portfolio_value)
         data = self.model_dump()
+        transactions = read_recent_transactions(self.name, REPORT_TRANSACTIONS)
+        data["transactions"] = [
+            {key: value for key, value in transaction.items() if key != "id"} for transaction in transactions
+        ]
+        if len(transactions) == REPORT_TRANSACTIONS:
+            data["transactions_note"] = (
+                f"Only the latest {REPORT_TRANSACTIONS} transactions are shown; use get_transactions for earlier ones"
+            )
+        resolution, rows = read_portfolio_series(self.name, max_points=REPORT_SERIES_POINTS)
+        data["portfolio_value_resolution"] = resolution
+        data["portfolio_value_time_series"] = [(when, close) for when, _, _, _, close in rows]
         data["total_portfolio_value"] = portfolio_value
         data["total_profit_loss"] = pnl
-        write_log(self.name, "account", f"Retrieved account details")
+        self.log(f"Retrieved account details")
         return json.dumps(data)
     
     def get_strategy(self) -> str:
         """ Return the strategy of the account """
-        write_log(self.name, "account", f"Retrieved strategy")
+        self.log(f"Retrieved strategy")
         return self.strategy
     
     def change_strategy(self, strategy: str) -> str:
         """ At your discretion, if you choose to, call this to change your investment strategy for the future """
         self.strategy = strategy
         self.save()
-        write_log(self.name, "account", f"Changed strategy")
+        self.log(f"Changed strategy")
         return "Changed strategy"
 
 # Example of usage:
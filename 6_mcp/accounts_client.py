@@ -1,39 +1,142 @@
 import mcp
-from mcp.client.stdio import stdio_client
 from mcp import StdioServerParameters
+from mcp.shared.exceptions import McpError
 from agents import FunctionTool
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from mcp_transport import MCP_TRANSPORT, PooledConnection, server_params, open_streams
+import asyncio
 import json
+import os
+import statistics
+import sys
+import tempfile
+import time
 
-params = StdioServerParameters(command="uv", args=["run", "accounts_server.py"], env=None)
+load_dotenv(override=True)
+
+if MCP_TRANSPORT == "stdio":
+    params = StdioServerParameters(command="uv", args=["run", "accounts_server.py"], env=None)
+else:
+    params = server_params("accounts_server")
+
+POOL_SIZE = int(os.getenv("ACCOUNTS_CLIENT_POOL_SIZE", "2"))
+
+
+class AccountsClientPool:
+    """
+    Keeps up to `size` initialized sessions to the accounts server alive and hands them out one caller at a time.
+    Sessions are health-checked after being idle, replaced if the server has died, and a call that fails
+    because the connection broke is retried once on a fresh session.
+    A caller holds one of `size` slots from checkout until its session is checked in or discarded,
+    so a discarded session frees its slot for the next waiting caller.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, server_params: StdioServerParameters | dict = params):
+        self.size = size
+        self.server_params = server_params
+        self._slots = asyncio.Semaphore(size)
+        self._idle: list[PooledConnection] = []
+        self._connections: list[PooledConnection] = []
+
+    async def _new_connection(self) -> PooledConnection:
+        connection = PooledConnection(self.server_params)
+        await connection.start()
+        self._connections.append(connection)
+        return connection
+
+    async def _close(self, connection: PooledConnection) -> None:
+        if connection in self._connections:
+            self._connections.remove(connection)
+        try:
+            await connection.close()
+        except Exception as e:
+            print(f"Error closing accounts client connection: {e}")
+
+    async def _checkout(self) -> PooledConnection:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                connection = self._idle.pop()
+                if await connection.healthy():
+                    return connection
+                await self._close(connection)
+            return await self._new_connection()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, connection: PooledConnection) -> None:
+        connection.last_used = time.monotonic()
+        if connection in self._connections:
+            self._idle.append(connection)
+        else:
+            asyncio.ensure_future(connection.close())
+        self._slots.release()
+
+    async def _discard(self, connection: PooledConnection) -> None:
+        try:
+            await asyncio.shield(self._close(connection))
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def session(self):
+        connection = await self._checkout()
+        try:
+            yield connection.session
+        except McpError:
+            self._checkin(connection)
+            raise
+        except BaseException:
+            await self._discard(connection)
+            raise
+        else:
+            self._checkin(connection)
+
+    async def run(self, operation):
+        """Run operation(session) on a pooled session, reconnecting and retrying once if the connection fails"""
+        try:
+            async with self.session() as session:
+                return await operation(session)
+        except McpError:
+            raise
+        except Exception as e:
+            print(f"Accounts client connection failed ({e}); reconnecting")
+        async with self.session() as session:
+            return await operation(session)
+
+    async def close(self) -> None:
+        """Shut down every session and its server subprocess"""
+        connections, self._connections, self._idle = self._connections, [], []
+        for connection in connections:
+            try:
+                await connection.close()
+            except Exception as e:
+                print(f"Error closing accounts client connection: {e}")
+
+
+pool = AccountsClientPool()
 
 
 async def list_accounts_tools():
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            tools_result = await session.list_tools()
-            return tools_result.tools
-        
+    tools_result = await pool.run(lambda session: session.list_tools())
+    return tools_result.tools
+
 async def call_accounts_tool(tool_name, tool_args):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.call_tool(tool_name, tool_args)
-            return result
-            
+    return await pool.run(lambda session: session.call_tool(tool_name, tool_args))
+
 async def read_accounts_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://accounts_server/{name}")
-            return result.contents[0].text
-        
+    result = await pool.run(lambda session: session.read_resource(f"accounts://accounts_server/{name}"))
+    return result.contents[0].text
+
 async def read_strategy_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://strategy/{name}")
-            return result.contents[0].text
+    result = await pool.run(lambda session: session.read_resource(f"accounts://strategy/{name}"))
+    return result.contents[0].text
+
+async def read_leaderboard_resource():
+    result = await pool.run(lambda session: session.read_resource("accounts://leaderboard"))
+    return result.contents[0].text
 
 async def get_accounts_tools_openai():
     openai_tools = []
@@ -44,7 +147,48 @@ async def get_accounts_tools_openai():
             description=tool.description,
             params_json_schema=schema,
             on_invoke_tool=lambda ctx, args, toolname=tool.name: call_accounts_tool(toolname, json.loads(args))
-                
+
         )
         openai_tools.append(openai_tool)
-    return openai_tools
\ No newline at end of file
+    return openai_tools
+
+
+async def benchmark(calls: int = 20) -> None:
+    """
+    Time reading an account over a new server subprocess and session per call, as this module used to,
+    against a pooled session, with the server running in a scratch directory
+    """
+    server = StdioServerParameters(
+        command=sys.executable,
+        args=[os.path.join(os.path.dirname(os.path.abspath(__file__)), "accounts_server.py")],
+        env={**os.environ, "FASTMCP_LOG_LEVEL": "WARNING"},
+        cwd=tempfile.mkdtemp(),
+    )
+
+    async def one_shot():
+        async with open_streams(server) as streams:
+            async with mcp.ClientSession(*streams) as session:
+                await session.initialize()
+                return await session.read_resource("accounts://strategy/benchmark")
+
+    async def timed(operation) -> float:
+        start = time.perf_counter()
+        await operation()
+        return time.perf_counter() - start
+
+    one_shot_timings = [await timed(one_shot) for _ in range(calls)]
+    benchmark_pool = AccountsClientPool(size=1, server_params=server)
+    first_call = await timed(lambda: benchmark_pool.run(lambda session: session.read_resource("accounts://strategy/benchmark")))
+    pooled_timings = [
+        await timed(lambda: benchmark_pool.run(lambda session: session.read_resource("accounts://strategy/benchmark")))
+        for _ in range(calls)
+    ]
+    await benchmark_pool.close()
+    print(f"Median of {calls} calls reading an account strategy")
+    print(f"     new subprocess and session per call: {statistics.median(one_shot_timings) * 1000:8.1f}ms")
+    print(f"  pooled session, first call (starts it): {first_call * 1000:8.1f}ms")
+    print(f"          pooled session, following calls: {statistics.median(pooled_timings) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
@@ -1,8 +1,31 @@
 from mcp.server.fastmcp import FastMCP
+from mcp_transport import run_server
 from accounts import Account
+from valuation import value_all_accounts
+from database import AccountVersionConflict, read_transactions_page
+from collections import defaultdict
+import asyncio
+import random
 
 mcp = FastMCP("accounts_server")
 
+MAX_ATTEMPTS = 5
+
+# Serializes changes to each account within this process; the version check catches other processes
+account_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+
+async def update_account(name: str, change):
+    """Apply change(account) to a freshly loaded account, retrying if another writer got there first"""
+    async with account_locks[name.lower()]:
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                return change(Account.get(name))
+            except AccountVersionConflict:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(random.uniform(0, 0.05 * 2**attempt))
+
 @mcp.tool()
 async def get_balance(name: str) -> float:
     """Get the cash balance of the given account name.
@@ -22,8 +45,8 @@ async def get_holdings(name: str) -> dict[str, int]:
     return Account.get(name).holdings
 
 @mcp.tool()
-async def buy_shares(name: str, symbol: str, quantity: int, rationale: str) -> float:
-    """Buy shares of a stock.
+async def buy_shares(name: str, symbol: str, quantity: int, rationale: str) -> str:
+    """Buy shares of a stock. Returns a confirmation with the fill price, the cash left and the new position.
 
     Args:
         name: The name of the account holder
@@ -31,12 +54,12 @@ async def buy_shares(name: str, symbol: str, quantity: int, rationale: str) -> f
         quantity: The quantity of shares to buy
         rationale: The rationale for the purchase and fit with the account's strategy
     """
-    return Account.get(name).buy_shares(symbol, quantity, rationale)
+    return await update_account(name, lambda account: account.buy_shares(symbol, quantity, rationale))
 
 
 @mcp.tool()
-async def sell_shares(name: str, symbol: str, quantity: int, rationale: str) -> float:
-    """Sell shares of a stock.
+async def sell_shares(name: str, symbol: str, quantity: int, rationale: str) -> str:
+    """Sell shares of a stock. Returns a confirmation with the fill price, the cash left and the new position.
 
     Args:
         name: The name of the account holder
@@ -44,7 +67,7 @@ async def sell_shares(name: str, symbol: str, quantity: int, rationale: str) ->
         quantity: The quantity of shares to sell
         rationale: The rationale for the sale and fit with the account's strategy
     """
-    return Account.get(name).sell_shares(symbol, quantity, rationale)
+    return await update_account(name, lambda account: account.sell_shares(symbol, quantity, rationale))
 
 @mcp.tool()
 async def change_strategy(name: str, strategy: str) -> str:
@@ -54,7 +77,34 @@ async def change_strategy(name: str, strategy: str) -> str:
         name: The name of the account holder
         strategy: The new strategy for the account
     """
-    return Account.get(name).change_strategy(strategy)
+    return await update_account(name, lambda account: account.change_strategy(strategy))
+
+@mcp.tool()
+async def get_transactions(name: str, since: str = "", limit: int = 20) -> dict:
+    """Get a page of the account's transactions, oldest first.
+
+    Args:
+        name: The name of the account holder
+        since: Only return transactions after this timestamp (YYYY-MM-DD HH:MM:SS), or pass next_since from the previous page to continue
+        limit: The maximum number of transactions to return, up to 100
+    """
+    limit = max(1, min(limit, 100))
+    timestamp, _, after_id = since.partition("#")
+    transactions = read_transactions_page(name, timestamp, int(after_id) if after_id else None, limit)
+    next_since = None
+    if len(transactions) == limit:
+        next_since = f"{transactions[-1]['timestamp']}#{transactions[-1]['id']}"
+    return {"transactions": transactions, "next_since": next_since}
+
+@mcp.tool()
+async def get_account_report(name: str) -> str:
+    """Get the account report: cash, holdings, the latest transactions, portfolio value history and profit or loss.
+    Use get_transactions to page through earlier transactions.
+
+    Args:
+        name: The name of the account holder
+    """
+    return Account.get(name).report()
 
 @mcp.resource("accounts://accounts_server/{name}")
 async def read_account_resource(name: str) -> str:
@@ -66,5 +116,9 @@ async def read_strategy_resource(name: str) -> str:
     account = Account.get(name.lower())
     return account.get_strategy()
 
+@mcp.resource("accounts://leaderboard")
+async def read_leaderboard_resource() -> str:
+    return value_all_accounts().leaderboard().to_json(orient="records")
+
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    run_server(mcp, "accounts_server")
\ No newline at end of file
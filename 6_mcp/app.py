@@ -1,10 +1,23 @@
+import asyncio
+from datetime import datetime, timedelta
 import gradio as gr
 from util import css, js, Color
 import pandas as pd
 from trading_floor import names, lastnames, short_model_names
 import plotly.express as px
 from accounts import Account
-from database import read_log
+from database import read_log_since, read_portfolio_series
+from collections import deque
+from changes import feed
+from valuation import value_accounts
+from metrics_report import load_metrics, trader_summary, tool_summary
+
+STREAM_HEARTBEAT_SECONDS = 15
+LOG_LINES = 13
+CHART_MAX_POINTS = 500
+# The chart's view windows, and how far back each one reaches; None shows all history
+CHART_WINDOWS = {"1D": timedelta(days=1), "1W": timedelta(weeks=1), "1M": timedelta(days=30), "All": None}
+DEFAULT_CHART_WINDOW = "All"
 
 mapper = {
     "trace": Color.WHITE,
@@ -24,7 +37,8 @@ class Trader:
         self.account = Account.get(name)
 
     def reload(self):
-        self.account = Account.get(self.name)
+        if feed.cursor(self.name, "account") != self.account.version:
+            self.account = Account.get(self.name)
 
     def get_title(self) -> str:
         return f"<div style='text-align: center;font-size:34px;'>{self.name}<span style='color:#ccc;font-size:24px;'> ({self.model_name}) - {self.lastname}</span></div>"
@@ -32,13 +46,18 @@ class Trader:
     def get_strategy(self) -> str:
         return self.account.get_strategy()
 
-    def get_portfolio_value_df(self) -> pd.DataFrame:
-        df = pd.DataFrame(self.account.portfolio_value_time_series, columns=["datetime", "value"])
+    def get_portfolio_value_df(self, since: str = "") -> pd.DataFrame:
+        """The portfolio value from since onwards, at a resolution that keeps it within CHART_MAX_POINTS"""
+        _, rows = read_portfolio_series(self.name, since, max_points=CHART_MAX_POINTS)
+        df = pd.DataFrame(rows, columns=["datetime", "open", "high", "low", "value"])
         df["datetime"] = pd.to_datetime(df["datetime"])
-        return df
+        return df[["datetime", "value"]]
 
-    def get_portfolio_value_chart(self):
-        df = self.get_portfolio_value_df()
+    def get_portfolio_value_chart(self, window: str = DEFAULT_CHART_WINDOW):
+        """Chart the portfolio value over the view window, at the resolution read_portfolio_series picks for it"""
+        span = CHART_WINDOWS[window]
+        since = (datetime.now() - span).strftime("%Y-%m-%d %H:%M:%S") if span else ""
+        df = self.get_portfolio_value_df(since)
         fig = px.line(df, x="datetime", y="value")
         margin = dict(l=40, r=20, t=20, b=40)
         fig.update_layout(
@@ -49,7 +68,8 @@ class Trader:
             paper_bgcolor="#bbb",
             plot_bgcolor="#dde",
         )
-        fig.update_xaxes(tickformat="%m/%d", tickangle=45, tickfont=dict(size=8))
+        tickformat = "%H:%M" if window == "1D" else "%m/%d"
+        fig.update_xaxes(tickformat=tickformat, tickangle=45, tickfont=dict(size=8))
         fig.update_yaxes(tickfont=dict(size=8), tickformat=",.0f")
         return fig
 
@@ -81,10 +101,13 @@ class Trader:
         return f"<div style='text-align: center;background-color:{color};'><span style='font-size:32px'>${portfolio_value:,.0f}</span><span style='font-size:24px'>&nbsp;&nbsp;&nbsp;{emoji}&nbsp;${pnl:,.0f}</span></div>"
 
     def get_logs(self, previous=None) -> str:
-        logs = read_log(self.name, last_n=13)
+        logs = read_log_since(self.name, limit=LOG_LINES)
+        return self.render_logs(logs, previous)
+
+    def render_logs(self, logs, previous=None) -> str:
         response = ""
         for log in logs:
-            timestamp, type, message = log
+            _, timestamp, type, message = log
             color = mapper.get(type, Color.WHITE).value
             response += f"<span style='color:{color}'>{timestamp} : [{type}] {message}</span><br/>"
         response = f"<div style='height:250px; overflow-y:auto;'>{response}</div>"
@@ -92,12 +115,40 @@ class Trader:
             return response
         return gr.update()
 
+    async def stream_logs(self):
+        """
+        Yield the log panel each time this trader's log cursor moves, reading only the new entries.
+        Nothing is queried while the cursor stands still, and no worker thread is held while waiting.
+        """
+        logs = deque(await asyncio.to_thread(read_log_since, self.name, limit=LOG_LINES), maxlen=LOG_LINES)
+        last_id = logs[-1][0] if logs else 0
+        cursor = last_id
+        yield self.render_logs(logs)
+        while True:
+            latest = await feed.changed(self.name, "log", cursor, timeout=STREAM_HEARTBEAT_SECONDS)
+            if latest == cursor:
+                yield gr.update()
+                continue
+            cursor = latest
+            new_logs = await asyncio.to_thread(read_log_since, self.name, last_id, limit=LOG_LINES)
+            while new_logs:
+                logs.extend(new_logs)
+                last_id = new_logs[-1][0]
+                new_logs = (
+                    await asyncio.to_thread(read_log_since, self.name, last_id, limit=LOG_LINES)
+                    if len(new_logs) == LOG_LINES
+                    else []
+                )
+            yield self.render_logs(logs)
+
 
 class TraderView:
     def __init__(self, trader: Trader):
         self.trader = trader
         self.portfolio_value = None
+        self.window = None
         self.chart = None
+        self.account_version = None
         self.holdings_table = None
         self.transactions_table = None
 
@@ -106,10 +157,15 @@ class TraderView:
             gr.HTML(self.trader.get_title())
             with gr.Row():
                 self.portfolio_value = gr.HTML(self.trader.get_portfolio_value)
+            with gr.Row():
+                self.window = gr.Radio(
+                    choices=list(CHART_WINDOWS), value=DEFAULT_CHART_WINDOW, show_label=False, container=False
+                )
             with gr.Row():
                 self.chart = gr.Plot(
                     self.trader.get_portfolio_value_chart, container=True, show_label=False
                 )
+            self.account_version = gr.Number(visible=False)
             with gr.Row(variant="panel"):
                 self.log = gr.HTML(self.trader.get_logs)
             with gr.Row():
@@ -136,7 +192,7 @@ class TraderView:
         timer = gr.Timer(value=120)
         timer.tick(
             fn=self.refresh,
-            inputs=[],
+            inputs=[self.window],
             outputs=[
                 self.portfolio_value,
                 self.chart,
@@ -146,23 +202,71 @@ class TraderView:
             show_progress="hidden",
             queue=False,
         )
-        log_timer = gr.Timer(value=0.5)
-        log_timer.tick(
-            fn=self.trader.get_logs,
-            inputs=[self.log],
+        for trigger in (self.window, self.account_version):
+            trigger.change(
+                fn=self.trader.get_portfolio_value_chart,
+                inputs=[self.window],
+                outputs=[self.chart],
+                show_progress="hidden",
+                queue=False,
+            )
+
+    def attach_streams(self, ui: gr.Blocks):
+        """Push log and account changes to each connected browser as they happen"""
+        ui.load(
+            fn=self.trader.stream_logs,
             outputs=[self.log],
             show_progress="hidden",
-            queue=False,
+            concurrency_limit=None,
+        )
+        ui.load(
+            fn=self.stream_account,
+            outputs=[
+                self.portfolio_value,
+                self.account_version,
+                self.holdings_table,
+                self.transactions_table,
+            ],
+            show_progress="hidden",
+            concurrency_limit=None,
         )
 
-    def refresh(self):
+    async def stream_account(self):
+        """
+        Yield a refreshed view each time this trader's account is saved, without holding a thread while waiting.
+        The new account version is yielded in place of the chart, and its change redraws the chart
+        over the view window selected in that browser.
+        """
+        version = feed.cursor(self.trader.name, "account")
+        while True:
+            latest = await feed.changed(self.trader.name, "account", version, timeout=STREAM_HEARTBEAT_SECONDS)
+            if latest == version:
+                yield gr.update(), gr.update(), gr.update(), gr.update()
+            else:
+                version = latest
+                value, holdings, transactions = await asyncio.to_thread(self.refresh_account)
+                yield value, version, holdings, transactions
+
+    def refresh_account(self):
         self.trader.reload()
-        return (
-            self.trader.get_portfolio_value(),
-            self.trader.get_portfolio_value_chart(),
-            self.trader.get_holdings_df(),
-            self.trader.get_transactions_df(),
-        )
+        return self.trader.get_portfolio_value(), self.trader.get_holdings_df(), self.trader.get_transactions_df()
+
+    def refresh(self, window: str = DEFAULT_CHART_WINDOW):
+        value, holdings, transactions = self.refresh_account()
+        return value, self.trader.get_portfolio_value_chart(window), holdings, transactions
+
+
+def get_leaderboard_df(traders: list[Trader]) -> pd.DataFrame:
+    """Rank the traders, valuing all their accounts in one pass with one price lookup"""
+    for trader in traders:
+        trader.reload()
+    return value_accounts([trader.account for trader in traders]).leaderboard()
+
+
+def get_run_metrics_dfs() -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Latency and token percentiles per trader and per tool over the last day of runs"""
+    df = load_metrics(hours=24)
+    return trader_summary(df).reset_index(), tool_summary(df).reset_index()
 
 
 # Main UI construction
@@ -181,6 +285,28 @@ def create_ui():
         with gr.Row():
             for trader_view in trader_views:
                 trader_view.make_ui()
+        with gr.Row():
+            leaderboard = gr.Dataframe(
+                value=lambda: get_leaderboard_df(traders),
+                label="Leaderboard",
+                headers=["Rank", "Trader", "Value", "P&L", "Cash", "Exposure"],
+                col_count=6,
+                elem_classes=["dataframe-fix-small"],
+            )
+        with gr.Accordion("Run metrics (last 24 hours)", open=False):
+            with gr.Row():
+                trader_metrics = gr.Dataframe(label="Per trader", elem_classes=["dataframe-fix-small"])
+                tool_metrics = gr.Dataframe(label="Per tool", elem_classes=["dataframe-fix-small"])
+        timer = gr.Timer(value=120)
+        timer.tick(
+            fn=lambda: get_leaderboard_df(traders), outputs=[leaderboard], show_progress="hidden", queue=False
+        )
+        timer.tick(
+            fn=get_run_metrics_dfs, outputs=[trader_metrics, tool_metrics], show_progress="hidden", queue=False
+        )
+        ui.load(fn=get_run_metrics_dfs, outputs=[trader_metrics, tool_metrics], show_progress="hidden")
+        for trader_view in trader_views:
+            trader_view.attach_streams(ui)
 
     return ui
 
@@ -0,0 +1,208 @@
+import argparse
+from collections import defaultdict
+from typing import Callable
+import numpy as np
+import pandas as pd
+from pydantic import PrivateAttr
+from accounts import Account, Transaction, INITIAL_BALANCE
+from database import read_market, read_market_dates, read_transactions
+
+# A decision function stands in for Runner.run: it is called once per simulated day
+# with the account and that day's prices, and trades by calling account.buy_shares / sell_shares
+
+Decision = Callable[["SimulatedAccount", str, dict[str, float]], None]
+
+
+class SimulatedAccount(Account):
+    """
+    An Account whose prices and clock come from the backtest instead of the market and the system time.
+    It keeps the same buy/sell logic, including the SPREAD, but writes nothing to the database.
+    """
+
+    _date: str = PrivateAttr(default="")
+    _prices: dict[str, float] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def create(cls, name: str, strategy: str = "", balance: float = INITIAL_BALANCE):
+        account = cls(name=name.lower(), balance=balance, strategy=strategy, holdings={}, net_invested=0.0)
+        account._transactions = []
+        account._portfolio_value_time_series = []
+        return account
+
+    def advance(self, date: str, prices: dict[str, float]):
+        self._date = date
+        self._prices = prices
+
+    def share_price(self, symbol: str) -> float:
+        return self._prices.get(symbol, 0.0)
+
+    def share_prices(self, symbols: list[str]) -> dict[str, float]:
+        return {symbol: self._prices.get(symbol, 0.0) for symbol in symbols}
+
+    def now(self) -> str:
+        return f"{self._date} 16:00:00"
+
+    def log(self, message: str):
+        pass
+
+    def save(self, transaction: Transaction | None = None, clear_history: bool = False):
+        if transaction:
+            self._transactions.append(transaction)
+
+    def add_portfolio_value(self, timestamp: str, value: float):
+        pass
+
+
+def load_history(source: str | None = None, start: str = "", end: str = "9999-12-31") -> dict[str, dict[str, float]]:
+    """
+    Daily close prices keyed by date, then symbol. Read from the market table by default,
+    or from a CSV or Parquet file with date, symbol and close columns.
+    """
+    if source is None:
+        return {date: read_market(date) for date in read_market_dates(start, end)}
+    if source.endswith(".parquet"):
+        df = pd.read_parquet(source, columns=["date", "symbol", "close"])
+    else:
+        df = pd.read_csv(source, usecols=["date", "symbol", "close"])
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    df = df[(df["date"] >= start) & (df["date"] <= end)]
+    history = {}
+    for date, day in df.groupby("date", sort=True):
+        history[date] = dict(zip(day["symbol"], day["close"].astype(float)))
+    return history
+
+
+def buy_and_hold(symbols: list[str]) -> Decision:
+    """Spend the opening balance equally across the symbols on the first day, then do nothing"""
+
+    def decide(account: SimulatedAccount, date: str, prices: dict[str, float]):
+        if account.transactions:
+            return
+        budget = account.balance / len(symbols)
+        for symbol in symbols:
+            price = prices.get(symbol, 0.0)
+            quantity = int(budget // (price * 1.01)) if price else 0
+            if quantity:
+                account.buy_shares(symbol, quantity, "Buy and hold")
+
+    return decide
+
+
+def replay_transactions(name: str) -> Decision:
+    """
+    Replay the trades a trader actually made, on the day it made them, at the backtest's prices.
+    This stands in for a recorded LLM; trades the simulated account can't afford are skipped.
+    """
+    by_date = defaultdict(list)
+    for fields in read_transactions(name):
+        by_date[fields["timestamp"][:10]].append(fields)
+
+    def decide(account: SimulatedAccount, date: str, prices: dict[str, float]):
+        for fields in by_date.get(date, []):
+            try:
+                if fields["quantity"] > 0:
+                    account.buy_shares(fields["symbol"], fields["quantity"], fields["rationale"])
+                else:
+                    account.sell_shares(fields["symbol"], -fields["quantity"], fields["rationale"])
+            except ValueError as e:
+                print(f"{date} {name}: skipped recorded trade ({e})")
+
+    return decide
+
+
+class BacktestResult:
+    """Per-trader equity curves, drawdowns and turnover, one row per trader and one column per date"""
+
+    def __init__(self, names: list[str], dates: list[str], equity: np.ndarray, traded: np.ndarray):
+        self.names = names
+        self.dates = dates
+        self.equity = equity
+        self.traded = traded
+        running_max = np.maximum.accumulate(equity, axis=1)
+        self.drawdown = equity / running_max - 1.0
+        self.turnover = traded.sum(axis=1) / equity.mean(axis=1)
+
+    def equity_curves(self) -> pd.DataFrame:
+        return pd.DataFrame(self.equity.T, index=pd.Index(self.dates, name="date"), columns=self.names)
+
+    def summary(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "final_value": self.equity[:, -1],
+                "return_pct": (self.equity[:, -1] / self.equity[:, 0] - 1.0) * 100,
+                "max_drawdown_pct": self.drawdown.min(axis=1) * 100,
+                "turnover": self.turnover,
+                "trades": self.traded.astype(bool).sum(axis=1),
+            },
+            index=pd.Index(self.names, name="trader"),
+        )
+
+
+def value_holdings(
+    history: dict[str, dict[str, float]], cash: np.ndarray, positions: list[list[dict[str, int]]]
+) -> np.ndarray:
+    """
+    Value every trader on every day in one pass: build the (trader, day, symbol) holdings array and the
+    (day, symbol) price matrix over just the symbols that were ever held, then equity = cash + holdings . prices.
+    Missing prices are carried forward from the last day the symbol traded.
+    """
+    dates = list(history)
+    symbols = sorted({symbol for days in positions for day in days for symbol in day})
+    if not symbols:
+        return cash
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+    prices = pd.DataFrame(
+        [[history[date].get(symbol, np.nan) for symbol in symbols] for date in dates], columns=symbols
+    )
+    prices = prices.ffill().fillna(0.0).to_numpy()
+    holdings = np.zeros((len(positions), len(dates), len(symbols)))
+    for t, days in enumerate(positions):
+        for d, day in enumerate(days):
+            for symbol, quantity in day.items():
+                holdings[t, d, column[symbol]] = quantity
+    return cash + np.einsum("tds,ds->td", holdings, prices)
+
+
+def run_backtest(
+    decisions: dict[str, Decision], history: dict[str, dict[str, float]], balance: float = INITIAL_BALANCE
+) -> BacktestResult:
+    """Step a simulated account per trader through each day of history, letting its decision function trade"""
+    names = list(decisions)
+    dates = list(history)
+    accounts = [SimulatedAccount.create(name, balance=balance) for name in names]
+    cash = np.zeros((len(names), len(dates)))
+    traded = np.zeros((len(names), len(dates)))
+    positions = [[] for _ in names]
+    for d, date in enumerate(dates):
+        prices = history[date]
+        for t, (name, account) in enumerate(zip(names, accounts)):
+            account.advance(date, prices)
+            trades_before = len(account.transactions)
+            decisions[name](account, date, prices)
+            traded[t, d] = sum(abs(tx.total()) for tx in account.transactions[trades_before:])
+            cash[t, d] = account.balance
+            positions[t].append(dict(account.holdings))
+    return BacktestResult(names, dates, value_holdings(history, cash, positions), traded)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the traders against recorded daily prices")
+    parser.add_argument("names", nargs="+", help="Traders whose recorded transactions are replayed")
+    parser.add_argument("--history", help="CSV or Parquet file of date, symbol, close; defaults to the market table")
+    parser.add_argument("--start", default="", help="First date, YYYY-MM-DD")
+    parser.add_argument("--end", default="9999-12-31", help="Last date, YYYY-MM-DD")
+    parser.add_argument("--benchmark", nargs="*", default=[], help="Symbols to add as an equal-weight buy-and-hold")
+    parser.add_argument("--output", help="Write the equity curves to this CSV file")
+    args = parser.parse_args()
+
+    history = load_history(args.history, args.start, args.end)
+    if not history:
+        raise SystemExit("No price history in the requested range")
+    decisions = {name.lower(): replay_transactions(name) for name in args.names}
+    if args.benchmark:
+        decisions["benchmark"] = buy_and_hold(args.benchmark)
+    result = run_backtest(decisions, history)
+    print(f"Backtested {len(result.dates)} days from {result.dates[0]} to {result.dates[-1]}")
+    print(result.summary().round(2).to_string())
+    if args.output:
+        result.equity_curves().to_csv(args.output)
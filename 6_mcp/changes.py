@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from database import add_write_listener, read_account_versions, read_data_version, read_log_cursors
+
+POLL_INTERVAL_SECONDS = 0.5
+
+
+class ChangeFeed:
+    """
+    Publishes a cursor per trader for their logs (the latest log id) and their account (its version).
+    Log cursors are only read for the traders someone has asked about, with an index seek each.
+
+    A background thread checks SQLite's data_version, which is a single pragma rather than a query,
+    and only reads the cursors when another connection has committed. Writes made in this process
+    wake it immediately; writes from other processes are picked up within POLL_INTERVAL_SECONDS.
+    Subscribers await changed until a cursor moves past the one they last saw. They are woken through
+    their event loop, so a waiting subscriber holds no thread.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL_SECONDS):
+        self.poll_interval = poll_interval
+        self._cursors: dict[tuple[str, str], int] = {}
+        self._names: set[str] = set()
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._async_waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._thread = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._refresh()
+                add_write_listener(self._wake.set)
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+
+    def track(self, name: str) -> None:
+        """Start following the trader's log cursor, reading it now if it isn't followed yet"""
+        name = name.lower()
+        with self._lock:
+            if name not in self._names:
+                self._names.add(name)
+                self._cursors[(name, "log")] = read_log_cursors([name])[name]
+
+    def cursor(self, name: str, kind: str) -> int:
+        """The current cursor for the trader, where kind is "log" or "account" """
+        self.track(name)
+        with self._lock:
+            return self._cursors.get((name.lower(), kind), 0)
+
+    async def changed(self, name: str, kind: str, after: int, timeout: float | None = None) -> int:
+        """Wait until the cursor differs from after, or the timeout passes, and return the cursor"""
+        self.start()
+        self.track(name)
+        key = (name.lower(), kind)
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        with self._lock:
+            if self._cursors.get(key, 0) != after:
+                return self._cursors.get(key, 0)
+            self._async_waiters.add(waiter)
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            while True:
+                remaining = None if deadline is None else deadline - loop.time()
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    return self.cursor(name, kind)
+                with self._lock:
+                    waiter[1].clear()
+                    if self._cursors.get(key, 0) != after:
+                        return self._cursors.get(key, 0)
+        finally:
+            with self._lock:
+                self._async_waiters.discard(waiter)
+
+    def _refresh(self) -> None:
+        with self._lock:
+            names = list(self._names)
+        cursors = {(name, "log"): cursor for name, cursor in read_log_cursors(names).items()}
+        cursors.update({(name, "account"): version for name, version in read_account_versions().items()})
+        with self._lock:
+            for name in self._names.difference(names):
+                cursors[(name, "log")] = self._cursors.get((name, "log"), 0)
+            if cursors != self._cursors:
+                self._cursors = cursors
+                for loop, event in self._async_waiters:
+                    if not loop.is_closed():
+                        loop.call_soon_threadsafe(event.set)
+
+    def _run(self) -> None:
+        data_version = read_data_version()
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            latest = read_data_version()
+            if latest != data_version:
+                data_version = latest
+                try:
+                    self._refresh()
+                except Exception as e:
+                    print(f"Change feed could not read cursors: {e}")
+
+
+feed = ChangeFeed()
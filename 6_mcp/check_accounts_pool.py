@@ -0,0 +1,101 @@
+"""
+Check that AccountsClientPool hands a freed slot to a waiting caller, with fake connections instead of server processes.
+
+Covers a holder being cancelled, or its connection breaking, while another caller waits on a full pool,
+and an idle session that has died being replaced. Run with: python check_accounts_pool.py
+"""
+
+import asyncio
+
+from accounts_client import AccountsClientPool
+
+WAIT_SECONDS = 2
+
+
+class FakeConnection:
+    """Stands in for PooledConnection, with a session that is just a label"""
+
+    opened = 0
+
+    def __init__(self):
+        FakeConnection.opened += 1
+        self.session = f"session {FakeConnection.opened}"
+        self.last_used = 0.0
+        self.alive = True
+
+    async def healthy(self) -> bool:
+        return self.alive
+
+    async def close(self) -> None:
+        self.alive = False
+
+
+class FakePool(AccountsClientPool):
+    async def _new_connection(self) -> FakeConnection:
+        connection = FakeConnection()
+        self._connections.append(connection)
+        return connection
+
+
+async def hold(pool: FakePool, entered: asyncio.Event, release: asyncio.Event) -> None:
+    async with pool.session():
+        entered.set()
+        await release.wait()
+
+
+async def check_cancelled_holder() -> None:
+    pool = FakePool(size=1)
+    entered = asyncio.Event()
+    holder = asyncio.create_task(hold(pool, entered, asyncio.Event()))
+    await entered.wait()
+    waiter = asyncio.create_task(pool.run(lambda session: asyncio.sleep(0, session)))
+    await asyncio.sleep(0.01)
+    assert not waiter.done(), "the waiter should be blocked on the full pool"
+
+    holder.cancel()
+    session = await asyncio.wait_for(waiter, WAIT_SECONDS)
+    assert session == "session 2", f"the waiter should get a new session, got {session}"
+    assert len(pool._connections) == 1, pool._connections
+    await pool.close()
+
+
+async def check_broken_holder() -> None:
+    pool = FakePool(size=1)
+
+    async def break_connection(session):
+        await asyncio.sleep(0.01)
+        raise ConnectionError("broken pipe")
+
+    async def broken() -> None:
+        async with pool.session() as session:
+            await break_connection(session)
+
+    holder = asyncio.create_task(broken())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(pool.run(lambda session: asyncio.sleep(0, session)))
+    await asyncio.wait({holder}, timeout=WAIT_SECONDS)
+    assert isinstance(holder.exception(), ConnectionError), holder
+    await asyncio.wait_for(waiter, WAIT_SECONDS)
+    assert len(pool._connections) == 1, pool._connections
+    await pool.close()
+
+
+async def check_dead_idle_session() -> None:
+    pool = FakePool(size=2)
+    first = await pool.run(lambda session: asyncio.sleep(0, session))
+    pool._connections[0].alive = False
+    second = await pool.run(lambda session: asyncio.sleep(0, session))
+    assert first != second, "a dead idle session should be replaced"
+    assert len(pool._connections) == 1, pool._connections
+    await pool.close()
+
+
+async def check() -> None:
+    await check_cancelled_holder()
+    await check_broken_holder()
+    await check_dead_idle_session()
+    print("Freed pool slots went to the waiting callers and dead sessions were replaced")
+
+
+if __name__ == "__main__":
+    asyncio.run(check())
@@ -0,0 +1,87 @@
+"""
+Check that the cost basis and P&L that Account updates trade by trade match a full recompute from its transactions.
+
+Random sequences of buys and sells are run against accounts in a scratch database, then each account is
+reloaded and its aggregates rebuilt from the transaction history. Run with: python check_aggregates.py
+"""
+
+import math
+import os
+import random
+import tempfile
+
+# accounts.db is created in the working directory on import, so point it at a scratch directory first
+os.chdir(tempfile.mkdtemp())
+
+from accounts import Account, INITIAL_BALANCE  # noqa: E402
+
+SYMBOLS = ["AAPL", "MSFT", "NVDA", "TSLA", "AMZN"]
+
+
+class PricedAccount(Account):
+    """An account that trades at prices set by the check instead of fetching them"""
+
+    prices: dict[str, float] = {}
+
+    def share_price(self, symbol: str) -> float:
+        return self.prices[symbol]
+
+    def share_prices(self, symbols: list[str]) -> dict[str, float]:
+        return {symbol: self.prices[symbol] for symbol in symbols}
+
+    def log(self, message: str):
+        pass
+
+
+def aggregates(account: Account) -> tuple:
+    return account.net_invested, account.realized_pnl, dict(account.average_costs), dict(account.holdings)
+
+
+def assert_close(expected: tuple, actual: tuple, context: str) -> None:
+    net_invested, realized_pnl, average_costs, holdings = expected
+    assert math.isclose(net_invested, actual[0], abs_tol=1e-6), f"{context}: net invested {actual[0]} != {net_invested}"
+    assert math.isclose(realized_pnl, actual[1], abs_tol=1e-6), f"{context}: realized P&L {actual[1]} != {realized_pnl}"
+    assert average_costs.keys() == actual[2].keys(), f"{context}: cost basis symbols {actual[2]} != {average_costs}"
+    for symbol, cost in average_costs.items():
+        assert math.isclose(cost, actual[2][symbol], rel_tol=1e-9), f"{context}: average cost of {symbol}"
+    assert holdings == actual[3], f"{context}: holdings {actual[3]} != {holdings}"
+
+
+def trade_randomly(account: PricedAccount, rng: random.Random, trades: int) -> None:
+    for _ in range(trades):
+        account.prices = {symbol: round(rng.uniform(5, 500), 2) for symbol in SYMBOLS}
+        held = [symbol for symbol, quantity in account.holdings.items() if quantity > 0]
+        if held and rng.random() < 0.4:
+            symbol = rng.choice(held)
+            account.sell_shares(symbol, rng.randint(1, account.holdings[symbol]), "check")
+        else:
+            symbol = rng.choice(SYMBOLS)
+            affordable = int(account.balance // (account.prices[symbol] * 1.01))
+            if affordable:
+                account.buy_shares(symbol, rng.randint(1, min(affordable, 50)), "check")
+
+
+def check(accounts: int = 200, trades: int = 60) -> None:
+    for seed in range(accounts):
+        rng = random.Random(seed)
+        account = PricedAccount.get(f"trader{seed}")
+        trade_randomly(account, rng, rng.randint(1, trades))
+        incremental = aggregates(account)
+
+        reloaded = PricedAccount.get(account.name)
+        assert_close(incremental, aggregates(reloaded), f"seed {seed} as saved")
+
+        total = sum(transaction.total() for transaction in reloaded.transactions)
+        assert math.isclose(incremental[0], total, abs_tol=1e-6), f"seed {seed}: net invested != sum of transactions"
+        assert math.isclose(reloaded.balance, INITIAL_BALANCE - total, abs_tol=1e-6), f"seed {seed}: balance"
+        at_cost = sum(quantity * reloaded.average_costs[symbol] for symbol, quantity in reloaded.holdings.items())
+        assert math.isclose(incremental[1], at_cost - total, abs_tol=1e-6), f"seed {seed}: realized P&L != cost - net"
+
+        reloaded.rebuild_aggregates()
+        assert_close(incremental, aggregates(reloaded), f"seed {seed} rebuilt")
+        assert_close(incremental, aggregates(PricedAccount.get(account.name)), f"seed {seed} rebuilt and saved")
+    print(f"Incremental aggregates matched a full recompute for {accounts} accounts")
+
+
+if __name__ == "__main__":
+    check()
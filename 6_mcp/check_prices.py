@@ -0,0 +1,112 @@
+"""
+Check the batching and caching in market.get_share_prices offline, with a fake Polygon client that records its calls.
+
+Covers both plans: paid, which fetches every missing symbol with one multi-ticker snapshot request, and
+end of day, which fetches the grouped daily prices once and then reads them from the snapshot files.
+Run with: python check_prices.py
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# accounts.db and the snapshot files are created in the working directory, so point it at a scratch directory first
+os.chdir(tempfile.mkdtemp())
+
+import market  # noqa: E402
+
+
+class FakePolygonClient:
+    """Stands in for polygon.RESTClient, serving fixed prices and recording every request"""
+
+    def __init__(self, prices: dict[str, float]):
+        self.prices = prices
+        self.calls = []
+
+    def get_snapshot_all(self, market_type: str, tickers: list[str]):
+        self.calls.append(("get_snapshot_all", tuple(tickers)))
+        return [
+            SimpleNamespace(
+                ticker=ticker,
+                min=SimpleNamespace(close=self.prices[ticker]),
+                prev_day=SimpleNamespace(close=self.prices[ticker] - 1),
+            )
+            for ticker in tickers
+            if ticker in self.prices
+        ]
+
+    def get_previous_close_agg(self, ticker: str):
+        self.calls.append(("get_previous_close_agg", ticker))
+        return [SimpleNamespace(timestamp=datetime(2025, 1, 2, tzinfo=timezone.utc).timestamp() * 1000)]
+
+    def get_grouped_daily_aggs(self, date, adjusted: bool = True, include_otc: bool = False):
+        self.calls.append(("get_grouped_daily_aggs", str(date)))
+        return [SimpleNamespace(ticker=ticker, close=price) for ticker, price in self.prices.items()]
+
+
+PRICES = {"AAPL": 190.0, "MSFT": 410.0, "NVDA": 120.0, "TSLA": 250.0}
+
+
+def use_plan(plan: str) -> FakePolygonClient:
+    market.polygon_api_key = "fake"
+    market.is_paid_polygon = plan == "paid"
+    client = FakePolygonClient(PRICES)
+    market.set_polygon_client(client)
+    return client
+
+
+def check_paid() -> None:
+    client = use_plan("paid")
+    ttl = market.PRICE_CACHE_TTL_SECONDS["paid"]
+    market.PRICE_CACHE_TTL_SECONDS["paid"] = 0.2
+    try:
+        prices = market.get_share_prices(["AAPL", "MSFT", "AAPL", "XXXX"])
+        assert prices == {"AAPL": 190.0, "MSFT": 410.0, "XXXX": 0.0}, prices
+        assert client.calls == [("get_snapshot_all", ("AAPL", "MSFT", "XXXX"))], client.calls
+
+        assert market.get_share_prices(["MSFT", "AAPL"]) == {"MSFT": 410.0, "AAPL": 190.0}
+        assert market.get_share_price("AAPL") == 190.0
+        assert len(client.calls) == 1, "cached prices were fetched again"
+
+        market.get_share_prices(["AAPL", "NVDA", "TSLA"])
+        assert client.calls[-1] == ("get_snapshot_all", ("NVDA", "TSLA")), "only the missing symbols are fetched"
+
+        time.sleep(0.25)
+        market.get_share_prices(["AAPL"])
+        assert client.calls[-1] == ("get_snapshot_all", ("AAPL",)), "expired prices are fetched again"
+        assert len(client.calls) == 3, client.calls
+    finally:
+        market.PRICE_CACHE_TTL_SECONDS["paid"] = ttl
+
+
+def check_end_of_day() -> None:
+    client = use_plan("eod")
+    prices = market.get_share_prices(["AAPL", "NVDA", "XXXX"])
+    assert prices == {"AAPL": 190.0, "NVDA": 120.0, "XXXX": 0.0}, prices
+    assert [call[0] for call in client.calls] == ["get_previous_close_agg", "get_grouped_daily_aggs"], client.calls
+
+    market.clear_price_cache()
+    market.get_market_for_prior_date.cache_clear()
+    assert market.get_share_prices(["TSLA", "MSFT"]) == {"TSLA": 250.0, "MSFT": 410.0}
+    assert len(client.calls) == 2, "a stored snapshot should be read from disk, not fetched"
+
+
+class OfflinePolygonClient(FakePolygonClient):
+    def get_snapshot_all(self, market_type: str, tickers: list[str]):
+        raise ConnectionError("offline")
+
+
+def check_fallback() -> None:
+    use_plan("paid")
+    market.set_polygon_client(OfflinePolygonClient(PRICES))
+    prices = market.get_share_prices(["AAPL", "MSFT"])
+    assert set(prices) == {"AAPL", "MSFT"} and all(1 <= price <= 100 for price in prices.values()), prices
+
+
+if __name__ == "__main__":
+    check_paid()
+    check_end_of_day()
+    check_fallback()
+    print("Price batching and caching behaved as expected on the paid and end of day plans")
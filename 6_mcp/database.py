@@ -1,46 +1,508 @@
+import os
 import sqlite3
 import json
-from datetime import datetime
+import tempfile
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
 DB = "accounts.db"
+BUSY_TIMEOUT_MS = 5000
 
+_local = threading.local()
 
-with sqlite3.connect(DB) as conn:
-    cursor = conn.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)')
+
+class AccountVersionConflict(Exception):
+    """Raised when an account was changed by someone else since it was read"""
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Return this thread's connection to the database, opening it on first use.
+
+    Connections are reused for the life of the thread, so async tasks on the event loop share one.
+    WAL lets the UI read while traders write, and synchronous=NORMAL avoids an fsync per commit.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        _local.conn = conn
+    return conn
+
+
+_write_listeners = []
+
+
+def add_write_listener(listener) -> None:
+    """Register a callable to be invoked after every account or log write in this process"""
+    _write_listeners.append(listener)
+
+
+def notify_write_listeners() -> None:
+    for listener in _write_listeners:
+        listener()
+
+
+def close_connection() -> None:
+    """Close this thread's connection, if one is open"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+# SQL is kept as module constants so sqlite3's statement cache reuses the prepared statements
+
+UPSERT_ACCOUNT = """
+    INSERT INTO accounts (name, balance, strategy, net_invested, realized_pnl)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        balance=excluded.balance,
+        strategy=excluded.strategy,
+        net_invested=excluded.net_invested,
+        realized_pnl=excluded.realized_pnl,
+        version=version + 1
+"""
+INSERT_ACCOUNT = """
+    INSERT INTO accounts (name, balance, strategy, net_invested, realized_pnl, version)
+    VALUES (?, ?, ?, ?, ?, 1)
+    ON CONFLICT(name) DO NOTHING
+"""
+UPDATE_ACCOUNT = """
+    UPDATE accounts
+    SET balance = ?, strategy = ?, net_invested = ?, realized_pnl = ?, version = version + 1
+    WHERE name = ? AND version = ?
+"""
+SELECT_ACCOUNT = """
+    SELECT name, balance, strategy, net_invested, realized_pnl, version FROM accounts WHERE name = ?
+"""
+DELETE_HOLDINGS = "DELETE FROM holdings WHERE name = ?"
+INSERT_HOLDING = "INSERT INTO holdings (name, symbol, quantity, average_cost) VALUES (?, ?, ?, ?)"
+SELECT_HOLDINGS = "SELECT symbol, quantity, average_cost FROM holdings WHERE name = ? ORDER BY rowid"
+SELECT_ACCOUNT_TOTALS = "SELECT name, balance, net_invested, version FROM accounts ORDER BY name"
+SELECT_ALL_HOLDINGS = "SELECT name, symbol, quantity FROM holdings WHERE quantity != 0"
+INSERT_TRANSACTION = """
+    INSERT INTO transactions (name, symbol, quantity, price, timestamp, rationale)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+SELECT_TRANSACTIONS = """
+    SELECT symbol, quantity, price, timestamp, rationale FROM transactions
+    WHERE name = ?
+    ORDER BY id
+"""
+SELECT_TRANSACTIONS_PAGE = """
+    SELECT id, symbol, quantity, price, timestamp, rationale FROM transactions
+    WHERE name = ? AND (timestamp > ? OR (timestamp = ? AND id > ?))
+    ORDER BY id
+    LIMIT ?
+"""
+SELECT_RECENT_TRANSACTIONS = """
+    SELECT id, symbol, quantity, price, timestamp, rationale FROM transactions
+    WHERE name = ?
+    ORDER BY id DESC
+    LIMIT ?
+"""
+DELETE_TRANSACTIONS = "DELETE FROM transactions WHERE name = ?"
+INSERT_SNAPSHOT = "INSERT INTO portfolio_snapshots (name, datetime, value) VALUES (?, ?, ?)"
+SELECT_SNAPSHOTS = "SELECT datetime, value FROM portfolio_snapshots WHERE name = ? ORDER BY id"
+DELETE_SNAPSHOTS = "DELETE FROM portfolio_snapshots WHERE name = ?"
+COUNT_SNAPSHOTS_SINCE = "SELECT COUNT(*) FROM portfolio_snapshots WHERE name = ? AND datetime >= ?"
+SELECT_SNAPSHOTS_SINCE = """
+    SELECT datetime, value FROM portfolio_snapshots
+    WHERE name = ? AND datetime >= ?
+    ORDER BY datetime
+"""
+UPSERT_ROLLUP = """
+    INSERT INTO portfolio_rollups (name, resolution, bucket, open, high, low, close)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(name, resolution, bucket) DO UPDATE SET
+        high=max(high, excluded.high),
+        low=min(low, excluded.low),
+        close=excluded.close
+"""
+COUNT_ROLLUPS_SINCE = """
+    SELECT COUNT(*) FROM portfolio_rollups WHERE name = ? AND resolution = ? AND bucket >= ?
+"""
+SELECT_ROLLUPS_SINCE = """
+    SELECT bucket, open, high, low, close FROM portfolio_rollups
+    WHERE name = ? AND resolution = ? AND bucket >= ?
+    ORDER BY bucket
+"""
+DELETE_ROLLUPS = "DELETE FROM portfolio_rollups WHERE name = ?"
+
+# Rollup resolutions, finest first, and how a "YYYY-MM-DD HH:MM:SS" timestamp maps to its bucket in each
+
+ROLLUP_RESOLUTIONS = {
+    "5min": lambda when: f"{when[:14]}{int(when[14:16]) // 5 * 5:02d}:00",
+    "hour": lambda when: f"{when[:13]}:00:00",
+    "day": lambda when: f"{when[:10]} 00:00:00",
+}
+INSERT_LOG = """
+    INSERT INTO logs (name, datetime, type, message)
+    VALUES (?, datetime('now'), ?, ?)
+"""
+INSERT_LOG_AT = """
+    INSERT INTO logs (name, datetime, type, message)
+    VALUES (?, ?, ?, ?)
+"""
+SELECT_LOGS = """
+    SELECT id, datetime, type, message FROM logs 
+    WHERE name = ? 
+    ORDER BY id DESC
+    LIMIT ?
+"""
+SELECT_LOGS_SINCE = """
+    SELECT id, datetime, type, message FROM logs
+    WHERE name = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+SELECT_LOG_BATCH = """
+    SELECT id, name, datetime, type, message FROM logs
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+DELETE_LOGS_THROUGH = "DELETE FROM logs WHERE id <= ?"
+INSERT_SPAN_METRIC = """
+    INSERT INTO span_metrics (trace_id, name, datetime, kind, label, seconds, input_tokens, output_tokens)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SELECT_SPAN_METRICS = """
+    SELECT trace_id, name, datetime, kind, label, seconds, input_tokens, output_tokens FROM span_metrics
+    WHERE datetime >= ?
+    ORDER BY id
+"""
+UPSERT_MARKET = """
+    INSERT INTO market (date, data)
+    VALUES (?, ?)
+    ON CONFLICT(date) DO UPDATE SET data=excluded.data
+"""
+SELECT_MARKET = "SELECT data FROM market WHERE date = ?"
+SELECT_MARKET_DATES = "SELECT date FROM market WHERE date >= ? AND date <= ? ORDER BY date"
+SELECT_LOG_CURSOR = "SELECT MAX(id) FROM logs WHERE name = ?"
+SELECT_ACCOUNT_VERSIONS = "SELECT name, version FROM accounts"
+SELECT_ACCOUNTS_REVISION = "SELECT COUNT(*), COALESCE(SUM(version), 0) FROM accounts"
+
+
+def create_account_tables(cursor: sqlite3.Cursor) -> None:
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS accounts (
+            name TEXT PRIMARY KEY,
+            balance REAL NOT NULL,
+            strategy TEXT NOT NULL DEFAULT '',
+            net_invested REAL,
+            realized_pnl REAL NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 1
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS holdings (
+            name TEXT,
+            symbol TEXT,
+            quantity INTEGER NOT NULL,
+            average_cost REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, symbol)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            symbol TEXT,
+            quantity INTEGER,
+            price REAL,
+            timestamp TEXT,
+            rationale TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS transactions_name_id ON transactions (name, id)')
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS logs (
+        CREATE TABLE IF NOT EXISTS portfolio_snapshots (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT,
-            datetime DATETIME,
-            type TEXT,
-            message TEXT
+            datetime TEXT,
+            value REAL
+        )
+    ''')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS portfolio_snapshots_name_id ON portfolio_snapshots (name, id)'
+    )
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS portfolio_snapshots_name_datetime ON portfolio_snapshots (name, datetime)'
+    )
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_rollups (
+            name TEXT,
+            resolution TEXT,
+            bucket TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            PRIMARY KEY (name, resolution, bucket)
         )
     ''')
-    cursor.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
-    conn.commit()
 
-def write_account(name, account_dict):
-    json_data = json.dumps(account_dict)
-    with sqlite3.connect(DB) as conn:
+
+def rollup_rows(name: str, when: str, value: float) -> list[tuple]:
+    return [
+        (name, resolution, bucket(when), value, value, value, value)
+        for resolution, bucket in ROLLUP_RESOLUTIONS.items()
+    ]
+
+
+def build_missing_rollups(cursor: sqlite3.Cursor) -> None:
+    """Roll up snapshots recorded before the rollup table existed"""
+    if cursor.execute("SELECT 1 FROM portfolio_rollups LIMIT 1").fetchone():
+        return
+    snapshots = cursor.execute("SELECT name, datetime, value FROM portfolio_snapshots ORDER BY id")
+    rows = [row for name, when, value in snapshots.fetchall() for row in rollup_rows(name, when, value)]
+    cursor.executemany(UPSERT_ROLLUP, rows)
+
+
+def migrate_legacy_accounts(cursor: sqlite3.Cursor) -> None:
+    """
+    Move accounts stored as one JSON blob per row into the relational tables.
+    The old table is kept as accounts_legacy so nothing is lost.
+
+    The rename, the new tables and the copied rows are committed together, so if any account fails to load
+    nothing changes and the migration runs again on the next start. The check is repeated once the write lock
+    is held, in case another process migrated the accounts first.
+    """
+    if not is_legacy_accounts_table(cursor):
+        return
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        if is_legacy_accounts_table(cursor):
+            copy_legacy_accounts(cursor)
+        cursor.connection.commit()
+    except BaseException:
+        cursor.connection.rollback()
+        raise
+
+
+def is_legacy_accounts_table(cursor: sqlite3.Cursor) -> bool:
+    return "account" in [row[1] for row in cursor.execute("PRAGMA table_info(accounts)")]
+
+
+def copy_legacy_accounts(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("ALTER TABLE accounts RENAME TO accounts_legacy")
+    create_account_tables(cursor)
+    for name, blob in cursor.execute("SELECT name, account FROM accounts_legacy").fetchall():
+        account = json.loads(blob)
+        # net_invested is left NULL so Account.get rebuilds the aggregates from the transactions
+        cursor.execute(UPSERT_ACCOUNT, (name, account["balance"], account.get("strategy", ""), None, 0.0))
+        cursor.executemany(
+            INSERT_HOLDING,
+            [(name, symbol, quantity, 0.0) for symbol, quantity in account.get("holdings", {}).items()],
+        )
+        cursor.executemany(
+            INSERT_TRANSACTION,
+            [
+                (name, t["symbol"], t["quantity"], t["price"], t["timestamp"], t["rationale"])
+                for t in account.get("transactions", [])
+            ],
+        )
+        cursor.executemany(
+            INSERT_SNAPSHOT,
+            [(name, when, value) for when, value in account.get("portfolio_value_time_series", [])],
+        )
+
+
+def add_missing_columns(cursor: sqlite3.Cursor) -> None:
+    """Add the cost basis, P&L and version columns to account tables created before they existed"""
+    account_columns = [row[1] for row in cursor.execute("PRAGMA table_info(accounts)")]
+    if "net_invested" not in account_columns:
+        cursor.execute("ALTER TABLE accounts ADD COLUMN net_invested REAL")
+        cursor.execute("ALTER TABLE accounts ADD COLUMN realized_pnl REAL NOT NULL DEFAULT 0")
+    if "version" not in account_columns:
+        cursor.execute("ALTER TABLE accounts ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    holding_columns = [row[1] for row in cursor.execute("PRAGMA table_info(holdings)")]
+    if "average_cost" not in holding_columns:
+        cursor.execute("ALTER TABLE holdings ADD COLUMN average_cost REAL NOT NULL DEFAULT 0")
+
+
+def create_tables() -> None:
+    with get_connection() as conn:
         cursor = conn.cursor()
+        migrate_legacy_accounts(cursor)
+        create_account_tables(cursor)
+        add_missing_columns(cursor)
+        build_missing_rollups(cursor)
         cursor.execute('''
-            INSERT INTO accounts (name, account)
-            VALUES (?, ?)
-            ON CONFLICT(name) DO UPDATE SET account=excluded.account
-        ''', (name.lower(), json_data))
-        conn.commit()
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                datetime DATETIME,
+                type TEXT,
+                message TEXT
+            )
+        ''')
+        # Not a covering index: the log reads seek to a trader's newest ids here, then look up datetime, type
+        # and message in the table row by rowid. Only the MAX(id) cursor read is answered from the index alone.
+        cursor.execute('CREATE INDEX IF NOT EXISTS logs_name_id ON logs (name, id)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS span_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trace_id TEXT,
+                name TEXT,
+                datetime DATETIME,
+                kind TEXT,
+                label TEXT,
+                seconds REAL,
+                input_tokens INTEGER,
+                output_tokens INTEGER
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS span_metrics_datetime ON span_metrics (datetime)')
+
+
+
+create_tables()
+
+def write_account(name, account_dict, transaction: dict | None = None, clear_history: bool = False):
+    """
+    Write the account's balance, strategy and holdings, and optionally append one transaction,
+    all in one database transaction. History is only ever appended, never rewritten,
+    except that clear_history deletes every transaction and portfolio snapshot in that same transaction.
+
+    If account_dict has a version, the write only succeeds if the stored account is still at that version
+    (version 0 meaning it doesn't exist yet), otherwise AccountVersionConflict is raised and nothing is written.
+    Returns the new version.
+    """
+    name = name.lower()
+    holdings = account_dict.get("holdings", {})
+    average_costs = account_dict.get("average_costs", {})
+    version = account_dict.get("version")
+    fields = (
+        account_dict["balance"],
+        account_dict.get("strategy", ""),
+        account_dict.get("net_invested"),
+        account_dict.get("realized_pnl", 0.0),
+    )
+    with get_connection() as conn:
+        if version is None:
+            conn.execute(UPSERT_ACCOUNT, (name, *fields))
+        elif version == 0:
+            if conn.execute(INSERT_ACCOUNT, (name, *fields)).rowcount == 0:
+                raise AccountVersionConflict(f"Account {name} already exists")
+        elif conn.execute(UPDATE_ACCOUNT, (*fields, name, version)).rowcount == 0:
+            raise AccountVersionConflict(f"Account {name} has changed since version {version} was read")
+        if clear_history:
+            conn.execute(DELETE_TRANSACTIONS, (name,))
+            conn.execute(DELETE_SNAPSHOTS, (name,))
+            conn.execute(DELETE_ROLLUPS, (name,))
+        conn.execute(DELETE_HOLDINGS, (name,))
+        conn.executemany(
+            INSERT_HOLDING,
+            [
+                (name, symbol, quantity, average_costs.get(symbol, 0.0))
+                for symbol, quantity in holdings.items()
+            ],
+        )
+        if transaction:
+            conn.execute(
+                INSERT_TRANSACTION,
+                (
+                    name,
+                    transaction["symbol"],
+                    transaction["quantity"],
+                    transaction["price"],
+                    transaction["timestamp"],
+                    transaction["rationale"],
+                ),
+            )
+    notify_write_listeners()
+    return None if version is None else version + 1
 
 def read_account(name):
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT account FROM accounts WHERE name = ?', (name.lower(),))
-        row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
-    
+    """Read the balance, strategy and holdings; transactions and snapshots are read separately"""
+    conn = get_connection()
+    row = conn.execute(SELECT_ACCOUNT, (name.lower(),)).fetchone()
+    if not row:
+        return None
+    holdings = conn.execute(SELECT_HOLDINGS, (name.lower(),)).fetchall()
+    return {
+        "name": row[0],
+        "balance": row[1],
+        "strategy": row[2],
+        "net_invested": row[3],
+        "realized_pnl": row[4],
+        "version": row[5],
+        "holdings": {symbol: quantity for symbol, quantity, _ in holdings},
+        "average_costs": {symbol: average_cost for symbol, _, average_cost in holdings},
+    }
+
+def read_all_positions() -> tuple[list[tuple[str, float, float | None, int]], list[tuple[str, str, int]]]:
+    """
+    (name, balance, net_invested, version) for every account and (name, symbol, quantity) for every open position,
+    for valuing them all at once. Both are read in one transaction, so every position belongs to a listed account.
+    net_invested is None for legacy accounts whose aggregates haven't been rebuilt yet.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN")
+        return conn.execute(SELECT_ACCOUNT_TOTALS).fetchall(), conn.execute(SELECT_ALL_HOLDINGS).fetchall()
+
+def read_transactions(name) -> list[dict]:
+    rows = get_connection().execute(SELECT_TRANSACTIONS, (name.lower(),)).fetchall()
+    keys = ("symbol", "quantity", "price", "timestamp", "rationale")
+    return [dict(zip(keys, row)) for row in rows]
+
+def read_transactions_page(name, since: str = "", after_id: int | None = None, limit: int = 50) -> list[dict]:
+    """
+    Up to limit transactions, oldest first, made after the since timestamp,
+    or at that timestamp but after the transaction with id after_id
+    """
+    rows = get_connection().execute(
+        SELECT_TRANSACTIONS_PAGE, (name.lower(), since, since, after_id, limit)
+    ).fetchall()
+    keys = ("id", "symbol", "quantity", "price", "timestamp", "rationale")
+    return [dict(zip(keys, row)) for row in rows]
+
+def read_recent_transactions(name, limit: int = 20) -> list[dict]:
+    """The latest limit transactions, oldest first"""
+    rows = get_connection().execute(SELECT_RECENT_TRANSACTIONS, (name.lower(), limit)).fetchall()
+    keys = ("id", "symbol", "quantity", "price", "timestamp", "rationale")
+    return [dict(zip(keys, row)) for row in reversed(rows)]
+
+def write_portfolio_snapshot(name: str, timestamp: str, value: float) -> None:
+    with get_connection() as conn:
+        conn.execute(INSERT_SNAPSHOT, (name.lower(), timestamp, value))
+        conn.executemany(UPSERT_ROLLUP, rollup_rows(name.lower(), timestamp, value))
+
+def read_portfolio_snapshots(name) -> list[tuple[str, float]]:
+    return get_connection().execute(SELECT_SNAPSHOTS, (name.lower(),)).fetchall()
+
+def read_portfolio_series(name, since: str = "", max_points: int = 500) -> tuple[str, list[tuple]]:
+    """
+    Read the portfolio value series from since onwards at the finest resolution with at most max_points points,
+    trying the raw snapshots, then 5 minute, hourly and daily rollups. If even the daily series is too long,
+    it is thinned to max_points.
+
+    Returns:
+        tuple: The resolution used, and a list of (datetime, open, high, low, close) tuples
+    """
+    conn = get_connection()
+    name = name.lower()
+    if conn.execute(COUNT_SNAPSHOTS_SINCE, (name, since)).fetchone()[0] <= max_points:
+        rows = conn.execute(SELECT_SNAPSHOTS_SINCE, (name, since)).fetchall()
+        return "raw", [(when, value, value, value, value) for when, value in rows]
+    for resolution in ROLLUP_RESOLUTIONS:
+        if conn.execute(COUNT_ROLLUPS_SINCE, (name, resolution, since)).fetchone()[0] <= max_points:
+            break
+    rows = conn.execute(SELECT_ROLLUPS_SINCE, (name, resolution, since)).fetchall()
+    if len(rows) > max_points:
+        step = -(-len(rows) // max_points)
+        rows = rows[::step]
+    return resolution, rows
+
 def write_log(name: str, type: str, message: str):
     """
     Write a log entry to the logs table.
@@ -50,15 +512,33 @@ def write_log(name: str, type: str, message: str):
         type (str): The type of log entry
         message (str): The log message
     """
-    now = datetime.now().isoformat()
-    
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO logs (name, datetime, type, message)
-            VALUES (?, datetime('now'), ?, ?)
-        ''', (name.lower(), type, message))
-        conn.commit()
+    with get_connection() as conn:
+        conn.execute(INSERT_LOG, (name.lower(), type, message))
+    notify_write_listeners()
+
+def write_logs(entries: list[tuple[str, str, str, str]]):
+    """
+    Write a batch of log entries to the logs table in a single transaction.
+
+    Args:
+        entries (list): Tuples of (name, datetime, type, message), with name already lowercased
+    """
+    with get_connection() as conn:
+        conn.executemany(INSERT_LOG_AT, entries)
+    notify_write_listeners()
+
+def write_span_metrics(rows: list[tuple]):
+    """
+    Write the metrics for one run in a single transaction.
+
+    Args:
+        rows (list): Tuples of (trace_id, name, datetime, kind, label, seconds, input_tokens, output_tokens)
+    """
+    with get_connection() as conn:
+        conn.executemany(INSERT_SPAN_METRIC, rows)
+
+def read_span_metrics(since: str = "") -> list[tuple]:
+    return get_connection().execute(SELECT_SPAN_METRICS, (since,)).fetchall()
 
 def read_log(name: str, last_n=10):
     """
@@ -71,31 +551,123 @@ def read_log(name: str, last_n=10):
     Returns:
         list: A list of tuples containing (datetime, type, message)
     """
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT datetime, type, message FROM logs 
-            WHERE name = ? 
-            ORDER BY datetime DESC
-            LIMIT ?
-        ''', (name.lower(), last_n))
+    rows = get_connection().execute(SELECT_LOGS, (name.lower(), last_n)).fetchall()
+    return reversed([row[1:] for row in rows])
+
+def read_log_since(name: str, last_id: int | None = None, limit=100):
+    """
+    Read the log entries for a given name that were written after the entry with id last_id.
+    
+    Args:
+        name (str): The name to retrieve logs for
+        last_id (int | None): The id of the last entry already seen, or None to start from the most recent entries
+        limit (int): Maximum number of entries to return; call again with the last id returned for more
         
-        return reversed(cursor.fetchall())
+    Returns:
+        list: A list of tuples containing (id, datetime, type, message), oldest first
+    """
+    conn = get_connection()
+    if last_id is None:
+        return list(reversed(conn.execute(SELECT_LOGS, (name.lower(), limit)).fetchall()))
+    return conn.execute(SELECT_LOGS_SINCE, (name.lower(), last_id, limit)).fetchall()
+
+def read_log_batch(after_id: int, limit: int) -> list[tuple]:
+    """Read up to limit log entries for every name, with ids after after_id, as (id, name, datetime, type, message)"""
+    return get_connection().execute(SELECT_LOG_BATCH, (after_id, limit)).fetchall()
+
+def delete_logs_through(last_id: int) -> int:
+    """Delete every log entry with an id up to and including last_id, returning how many were deleted"""
+    with get_connection() as conn:
+        return conn.execute(DELETE_LOGS_THROUGH, (last_id,)).rowcount
 
 def write_market(date: str, data: dict) -> None:
     data_json = json.dumps(data)
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO market (date, data)
-            VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET data=excluded.data
-        ''', (date, data_json))
-        conn.commit()
+    with get_connection() as conn:
+        conn.execute(UPSERT_MARKET, (date, data_json))
 
 def read_market(date: str) -> dict | None:
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT data FROM market WHERE date = ?', (date,))
-        row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
\ No newline at end of file
+    row = get_connection().execute(SELECT_MARKET, (date,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def read_market_dates(start: str = "", end: str = "9999-12-31") -> list[str]:
+    rows = get_connection().execute(SELECT_MARKET_DATES, (start, end)).fetchall()
+    return [row[0] for row in rows]
+
+def read_log_cursors(names: list[str]) -> dict[str, int]:
+    """The id of the latest log entry for each of the names, which only ever increases; one index seek per name"""
+    conn = get_connection()
+    return {name: conn.execute(SELECT_LOG_CURSOR, (name.lower(),)).fetchone()[0] or 0 for name in names}
+
+def read_account_versions() -> dict[str, int]:
+    return dict(get_connection().execute(SELECT_ACCOUNT_VERSIONS).fetchall())
+
+def read_accounts_revision() -> tuple[int, int]:
+    """
+    The number of accounts and the sum of their versions. Versions only ever increase,
+    so this changes whenever any account is created or saved
+    """
+    return get_connection().execute(SELECT_ACCOUNTS_REVISION).fetchone()
+
+def read_data_version() -> int:
+    """A number that changes whenever another connection commits to the database"""
+    return get_connection().execute("PRAGMA data_version").fetchone()[0]
+
+
+def benchmark(trader_counts=(1, 4, 8), writes_per_trader: int = 500) -> None:
+    """
+    Time concurrent log and account writes from several trader threads against a scratch database,
+    opening a new connection for every write as this module used to, and then reusing per-thread WAL connections
+    """
+    global DB
+    original_db = DB
+
+    def connect_per_write(name: str, index: int) -> None:
+        with sqlite3.connect(DB) as conn:
+            conn.execute(INSERT_LOG, (name, "function", f"write {index}"))
+            conn.execute(UPSERT_ACCOUNT, (name, float(index), "", 0.0, 0.0))
+
+    def reused_connection(name: str, index: int) -> None:
+        with get_connection() as conn:
+            conn.execute(INSERT_LOG, (name, "function", f"write {index}"))
+            conn.execute(UPSERT_ACCOUNT, (name, float(index), "", 0.0, 0.0))
+
+    def trader(write, name: str, errors: list) -> None:
+        for index in range(writes_per_trader):
+            try:
+                write(name, index)
+            except sqlite3.OperationalError:
+                errors.append(name)
+        close_connection()
+
+    try:
+        for label, write in (("connect per write", connect_per_write), ("reused WAL connection", reused_connection)):
+            for count in trader_counts:
+                with tempfile.TemporaryDirectory() as directory:
+                    DB = os.path.join(directory, "benchmark.db")
+                    with sqlite3.connect(DB) as conn:
+                        create_account_tables(conn.cursor())
+                        conn.execute(
+                            "CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, "
+                            "datetime DATETIME, type TEXT, message TEXT)"
+                        )
+                    errors = []
+                    threads = [
+                        threading.Thread(target=trader, args=(write, f"trader{i}", errors)) for i in range(count)
+                    ]
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+                    writes = count * writes_per_trader - len(errors)
+                    print(
+                        f"{label:>22}, {count} traders: {writes / elapsed:8.0f} writes/sec, "
+                        f"{len(errors)} failed with database is locked"
+                    )
+    finally:
+        DB = original_db
+
+
+if __name__ == "__main__":
+    benchmark()
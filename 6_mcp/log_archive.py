@@ -0,0 +1,127 @@
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+import database
+from database import read_log_batch, delete_logs_through, read_log, read_log_since
+
+ARCHIVE_DIR = "log_archive"
+RETAIN_DAYS = 7
+BATCH_SIZE = 10_000
+
+
+def append_to_archive(day: str, rows: list[tuple]) -> None:
+    """Append rows to the gzip file for the day; gzip allows appending members to an existing file"""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with gzip.open(os.path.join(ARCHIVE_DIR, f"{day}.jsonl.gz"), "at", encoding="utf-8") as f:
+        for id, name, when, type, message in rows:
+            f.write(json.dumps({"id": id, "name": name, "datetime": when, "type": type, "message": message}))
+            f.write("\n")
+
+
+def archive_logs(retain_days: int = RETAIN_DAYS, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Move log entries older than retain_days into per-day compressed files and delete them from the table.
+    Entries are walked in id order from the oldest, stopping at the first one inside the retention window,
+    so every batch is a rowid range scan rather than a scan on datetime.
+    Returns the number of entries archived.
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retain_days)).strftime("%Y-%m-%d %H:%M:%S")
+    archived = 0
+    last_id = 0
+    while True:
+        rows = read_log_batch(last_id, batch_size)
+        old_rows = []
+        for row in rows:
+            if row[2] >= cutoff:
+                break
+            old_rows.append(row)
+        if not old_rows:
+            break
+        for day, day_rows in groupby(old_rows, key=lambda row: row[2][:10]):
+            append_to_archive(day, list(day_rows))
+        last_id = old_rows[-1][0]
+        delete_logs_through(last_id)
+        archived += len(old_rows)
+        if len(old_rows) < len(rows) or len(rows) < batch_size:
+            break
+    return archived
+
+
+# The dashboard query before the (name, id) index, which had to scan and sort the table
+
+UNINDEXED_READ_LOG = """
+    SELECT datetime, type, message FROM logs NOT INDEXED
+    WHERE name = ?
+    ORDER BY datetime DESC
+    LIMIT ?
+"""
+SYNTHETIC_LOGS = """
+    WITH RECURSIVE counter(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM counter WHERE i < ?)
+    INSERT INTO logs (name, datetime, type, message)
+    SELECT 'trader' || (i % ?), datetime(? + i * ?, 'unixepoch'), 'function', 'synthetic log entry ' || i
+    FROM counter
+"""
+
+
+def benchmark(rows: int = 10_000_000, traders: int = 4, days: int = 30) -> None:
+    """
+    Time the dashboard's log reads and the archive job over a synthetic log table in a scratch database,
+    with the entries spread evenly over the last `days` days
+    """
+    global ARCHIVE_DIR
+    original_db, original_archive_dir = database.DB, ARCHIVE_DIR
+
+    def timed(label: str, operation):
+        start = time.perf_counter()
+        result = operation()
+        print(f"{label:>40}: {(time.perf_counter() - start) * 1000:10.2f}ms")
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        database.DB = os.path.join(directory, "benchmark.db")
+        ARCHIVE_DIR = os.path.join(directory, "log_archive")
+        database.close_connection()
+        try:
+            database.create_tables()
+            start = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+            with database.get_connection() as conn:
+                timed(f"write {rows:,} synthetic entries", lambda: conn.execute(
+                    SYNTHETIC_LOGS, (rows, traders, start, days * 86400 / rows)
+                ))
+            conn = database.get_connection()
+            timed("read_log before, scanning the table", lambda: conn.execute(UNINDEXED_READ_LOG, ("trader1", 13)).fetchall())
+            timed("read_log on the (name, id) index", lambda: list(read_log("trader1", 13)))
+            latest = read_log_since("trader1", limit=13)
+            timed("read_log_since, nothing new", lambda: read_log_since("trader1", latest[-1][0]))
+            timed("read_log_since, 100 entries behind", lambda: read_log_since("trader1", latest[-1][0] - 100 * traders))
+            archived = timed(f"archive all but the last {RETAIN_DAYS} days", lambda: archive_logs(RETAIN_DAYS))
+            timed("read_log after archiving", lambda: list(read_log("trader1", 13)))
+            archive_bytes = sum(entry.stat().st_size for entry in os.scandir(ARCHIVE_DIR))
+            print(f"Archived {archived:,} entries into {archive_bytes / 1e6:.1f}MB of daily files")
+        finally:
+            database.close_connection()
+            database.DB, ARCHIVE_DIR = original_db, original_archive_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old trader logs into per-day compressed files")
+    parser.add_argument("--days", type=int, default=RETAIN_DAYS, help="Number of days of logs to keep in the database")
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        nargs="?",
+        const=10_000_000,
+        metavar="ROWS",
+        help="Instead, benchmark log reads and archiving on a synthetic table of ROWS entries, 10 million by default",
+    )
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        count = archive_logs(args.days)
+        print(f"Archived {count} log entries to {ARCHIVE_DIR}")
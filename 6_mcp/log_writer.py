@@ -0,0 +1,112 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from database import write_logs
+
+MAX_QUEUE = 10_000
+BATCH_SIZE = 200
+FLUSH_INTERVAL_SECONDS = 1.0
+
+_STOP = object()
+
+
+class LogWriter:
+    """
+    Buffers log entries in memory and writes them to the database from a background thread.
+
+    Entries are inserted with one executemany per batch, once BATCH_SIZE entries are waiting or
+    FLUSH_INTERVAL_SECONDS have passed since the first one arrived. When the queue is full, entries are
+    dropped (and counted) unless block is True, in which case the caller waits for space.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = MAX_QUEUE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        block: bool = False,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block = block
+        self.flushed = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def write(self, name: str, type: str, message: str) -> None:
+        """Queue a log entry, timestamped now in the same UTC format as SQLite's datetime('now')"""
+        self._ensure_started()
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            self._queue.put((name.lower(), now, type, message), block=self.block)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Block until every entry queued before this call has been written"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """Write any pending entries and stop the background thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _write_batch(self, batch: list) -> None:
+        if not batch:
+            return
+        try:
+            write_logs(batch)
+            with self._lock:
+                self.flushed += len(batch)
+        except Exception as e:
+            print(f"Failed to write {len(batch)} log entries: {e}")
+            with self._lock:
+                self.dropped += len(batch)
+        batch.clear()
+
+    def _run(self) -> None:
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._write_batch(batch)
+                deadline = None
+                continue
+            if item is _STOP:
+                self._write_batch(batch)
+                return
+            if isinstance(item, threading.Event):
+                self._write_batch(batch)
+                deadline = None
+                item.set()
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                deadline = None
+
+
+log_writer = LogWriter()
@@ -4,8 +4,11 @@ import os
 from datetime import datetime
 import random
 from database import write_market, read_market
+from market_snapshot import MarketSnapshot, read_snapshot, write_snapshot
 from functools import lru_cache
 from datetime import timezone
+import threading
+import time
 
 load_dotenv(override=True)
 
@@ -15,16 +18,41 @@ polygon_plan = os.getenv("POLYGON_PLAN")
 is_paid_polygon = polygon_plan == "paid"
 is_realtime_polygon = polygon_plan == "realtime"
 
+# How long a fetched price is reused, by the kind of data the plan gives us
 
-def is_market_open() -> bool:
-    client = RESTClient(polygon_api_key)
-    market_status = client.get_market_status()
-    return market_status.market == "open"
+PRICE_CACHE_TTL_SECONDS = {"paid": 60, "eod": 3600}
+
+_client = None
+_client_lock = threading.Lock()
+_price_cache: dict[tuple[str, str], tuple[float, float]] = {}
+_price_cache_lock = threading.Lock()
+
+
+def get_polygon_client():
+    """Return the shared Polygon client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = RESTClient(polygon_api_key)
+        return _client
+
+
+def set_polygon_client(client) -> None:
+    """Replace the shared Polygon client, e.g. with a fake one for offline use, and clear the price cache"""
+    global _client
+    with _client_lock:
+        _client = client
+    clear_price_cache()
+
+
+def clear_price_cache() -> None:
+    with _price_cache_lock:
+        _price_cache.clear()
 
 
 def get_all_share_prices_polygon_eod() -> dict[str, float]:
     """With much thanks to student Reema R. for fixing the timezone issue with this!"""
-    client = RESTClient(polygon_api_key)
+    client = get_polygon_client()
 
     probe = client.get_previous_close_agg("SPY")[0]
     last_close = datetime.fromtimestamp(probe.timestamp / 1000, tz=timezone.utc).date()
@@ -34,37 +62,72 @@ def get_all_share_prices_polygon_eod() -> dict[str, float]:
 
 
 @lru_cache(maxsize=2)
-def get_market_for_prior_date(today):
-    market_data = read_market(today)
-    if not market_data:
-        market_data = get_all_share_prices_polygon_eod()
-        write_market(today, market_data)
-    return market_data
-
-
-def get_share_price_polygon_eod(symbol) -> float:
+def get_market_for_prior_date(today) -> MarketSnapshot:
+    """
+    Return the prior close prices as a memory-mapped snapshot, building the snapshot file
+    from the market table, or from Polygon, the first time any process asks for the date
+    """
+    snapshot = read_snapshot(today)
+    if snapshot is None:
+        market_data = read_market(today)
+        if not market_data:
+            market_data = get_all_share_prices_polygon_eod()
+            write_market(today, market_data)
+        write_snapshot(today, market_data)
+        snapshot = read_snapshot(today)
+    return snapshot
+
+
+def get_share_prices_polygon_eod(symbols: list[str]) -> dict[str, float]:
     today = datetime.now().date().strftime("%Y-%m-%d")
-    market_data = get_market_for_prior_date(today)
-    return market_data.get(symbol, 0.0)
+    return get_market_for_prior_date(today).lookup(symbols)
 
 
-def get_share_price_polygon_min(symbol) -> float:
-    client = RESTClient(polygon_api_key)
-    result = client.get_snapshot_ticker("stocks", symbol)
-    return result.min.close or result.prev_day.close
+def get_share_prices_polygon_min(symbols: list[str]) -> dict[str, float]:
+    """Fetch every symbol with a single call to the multi-ticker snapshot endpoint"""
+    client = get_polygon_client()
+    results = client.get_snapshot_all("stocks", tickers=list(symbols))
+    prices = {result.ticker: result.min.close or result.prev_day.close for result in results}
+    return {symbol: prices.get(symbol, 0.0) for symbol in symbols}
 
 
-def get_share_price_polygon(symbol) -> float:
+def get_share_prices_polygon(symbols: list[str]) -> dict[str, float]:
     if is_paid_polygon:
-        return get_share_price_polygon_min(symbol)
+        return get_share_prices_polygon_min(symbols)
     else:
-        return get_share_price_polygon_eod(symbol)
-
-
-def get_share_price(symbol) -> float:
+        return get_share_prices_polygon_eod(symbols)
+
+
+def get_share_prices(symbols: list[str]) -> dict[str, float]:
+    """
+    Return the price of each symbol, fetching the ones not in the cache with one batch request.
+    Prices are cached per plan type for PRICE_CACHE_TTL_SECONDS.
+    """
+    plan = "paid" if is_paid_polygon else "eod"
+    now = time.monotonic()
+    prices = {}
+    with _price_cache_lock:
+        for symbol in symbols:
+            cached = _price_cache.get((plan, symbol))
+            if cached and cached[0] > now:
+                prices[symbol] = cached[1]
+    missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in prices]
+    if not missing:
+        return prices
     if polygon_api_key:
         try:
-            return get_share_price_polygon(symbol)
+            fetched = get_share_prices_polygon(missing)
+            expires = time.monotonic() + PRICE_CACHE_TTL_SECONDS[plan]
+            with _price_cache_lock:
+                for symbol, price in fetched.items():
+                    _price_cache[(plan, symbol)] = (expires, price)
+            prices.update(fetched)
+            return prices
         except Exception as e:
             print(f"Was not able to use the polygon API due to {e}; using a random number")
-    return float(random.randint(1, 100))
+    prices.update({symbol: float(random.randint(1, 100)) for symbol in missing})
+    return prices
+
+
+def get_share_price(symbol) -> float:
+    return get_share_prices([symbol])[symbol]
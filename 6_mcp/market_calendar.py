@@ -0,0 +1,158 @@
+import threading
+import time
+from datetime import date, datetime, time as clock_time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from market import get_polygon_client
+
+EXCHANGE = "NYSE"
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+REGULAR_OPEN = clock_time(9, 30)
+REGULAR_CLOSE = clock_time(16, 0)
+EARLY_CLOSE = clock_time(13, 0)
+
+# The computed calendar is always available; Polygon's upcoming holidays are layered on top at most this often
+
+REFRESH_SECONDS = 24 * 60 * 60
+RETRY_SECONDS = 15 * 60
+
+
+def observed(day: date) -> date:
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The nth given weekday of the month, counting from the end when n is negative"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7 + 7 * (-n - 1))
+
+
+def easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+@lru_cache(maxsize=None)
+def exchange_holidays(year: int) -> dict[date, str]:
+    """Full-day NYSE closures for the year under the exchange's standing rules"""
+    holidays = {
+        nth_weekday(year, 1, 0, 3): "Martin Luther King, Jr. Day",
+        nth_weekday(year, 2, 0, 3): "Washington's Birthday",
+        easter(year) - timedelta(days=2): "Good Friday",
+        nth_weekday(year, 5, 0, -1): "Memorial Day",
+        observed(date(year, 7, 4)): "Independence Day",
+        nth_weekday(year, 9, 0, 1): "Labor Day",
+        nth_weekday(year, 11, 3, 4): "Thanksgiving Day",
+        observed(date(year, 12, 25)): "Christmas Day",
+    }
+    # New Year's Day falling on a Saturday is not observed on the Friday before
+    if date(year, 1, 1).weekday() != 5:
+        holidays[observed(date(year, 1, 1))] = "New Year's Day"
+    if year >= 2022:
+        holidays[observed(date(year, 6, 19))] = "Juneteenth"
+    return holidays
+
+
+@lru_cache(maxsize=None)
+def early_closes(year: int) -> set[date]:
+    """Days the exchange closes at 1pm: the eve of Independence Day, Black Friday and Christmas Eve"""
+    days = {nth_weekday(year, 11, 3, 4) + timedelta(days=1)}
+    for eve in (date(year, 7, 3), date(year, 12, 24)):
+        if eve.weekday() < 4:
+            days.add(eve)
+    return days
+
+
+class MarketCalendar:
+    """
+    Answers whether the market is open, and when it next opens, from memory. Sessions come from the
+    regular hours and the computed holidays, overridden by Polygon's list of upcoming holidays and early closes,
+    which is fetched at most once a day. A failed refresh is logged and the computed calendar used instead.
+    """
+
+    def __init__(self):
+        self._overrides: dict[date, tuple[datetime, datetime] | None] = {}
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        try:
+            holidays = get_polygon_client().get_market_holidays()
+            overrides = {}
+            for holiday in holidays:
+                if holiday.exchange != EXCHANGE:
+                    continue
+                day = date.fromisoformat(holiday.date)
+                if holiday.status == "closed":
+                    overrides[day] = None
+                elif holiday.open and holiday.close:
+                    overrides[day] = (parse_timestamp(holiday.open), parse_timestamp(holiday.close))
+            self._overrides = overrides
+            self._next_refresh = time.monotonic() + REFRESH_SECONDS
+        except Exception as e:
+            print(f"Could not refresh the market calendar from Polygon, using the computed calendar: {e}")
+            self._next_refresh = time.monotonic() + RETRY_SECONDS
+
+    def _refresh_if_stale(self) -> None:
+        with self._lock:
+            if time.monotonic() >= self._next_refresh:
+                self.refresh()
+
+    def session(self, day: date) -> tuple[datetime, datetime] | None:
+        """The (open, close) times of the session on the day, in UTC, or None if the market is closed all day"""
+        self._refresh_if_stale()
+        if day in self._overrides:
+            return self._overrides[day]
+        if day.weekday() >= 5 or day in exchange_holidays(day.year):
+            return None
+        close = EARLY_CLOSE if day in early_closes(day.year) else REGULAR_CLOSE
+        return (
+            datetime.combine(day, REGULAR_OPEN, EXCHANGE_TZ).astimezone(timezone.utc),
+            datetime.combine(day, close, EXCHANGE_TZ).astimezone(timezone.utc),
+        )
+
+    def is_open(self, now: datetime | None = None) -> bool:
+        now = now or datetime.now(timezone.utc)
+        session = self.session(now.astimezone(EXCHANGE_TZ).date())
+        return session is not None and session[0] <= now < session[1]
+
+    def next_open(self, now: datetime | None = None) -> datetime:
+        """The start of the next session, or now if the market is open"""
+        now = now or datetime.now(timezone.utc)
+        day = now.astimezone(EXCHANGE_TZ).date()
+        for offset in range(15):
+            session = self.session(day + timedelta(days=offset))
+            if session is None or session[1] <= now:
+                continue
+            return max(session[0], now)
+        raise ValueError(f"No market session found within 15 days of {day}")
+
+    def seconds_until_open(self, now: datetime | None = None) -> float:
+        now = now or datetime.now(timezone.utc)
+        return (self.next_open(now) - now).total_seconds()
+
+
+def parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+calendar = MarketCalendar()
+
+
+def is_market_open() -> bool:
+    return calendar.is_open()
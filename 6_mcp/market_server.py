@@ -1,5 +1,6 @@
 from mcp.server.fastmcp import FastMCP
-from market import get_share_price
+from mcp_transport import run_server
+from market import get_share_price, get_share_prices
 
 mcp = FastMCP("market_server")
 
@@ -12,5 +13,14 @@ async def lookup_share_price(symbol: str) -> float:
     """
     return get_share_price(symbol)
 
+@mcp.tool()
+async def lookup_share_prices(symbols: list[str]) -> dict[str, float]:
+    """This tool provides the current prices of several stock symbols in one lookup.
+
+    Args:
+        symbols: the symbols of the stocks
+    """
+    return get_share_prices(symbols)
+
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
\ No newline at end of file
+    run_server(mcp, "market_server")
\ No newline at end of file
@@ -0,0 +1,161 @@
+import bisect
+import mmap
+import os
+import struct
+from array import array
+
+SNAPSHOT_DIR = "market_snapshots"
+
+# A snapshot file holds the ticker count, then the float64 prices, then the uint32 offsets of each ticker
+# in the utf-8 ticker bytes that follow, with the tickers sorted so a lookup is a binary search.
+# Only the standard library is used, so a newly spawned server doesn't pay for importing numpy on its first lookup.
+
+HEADER = struct.Struct("<Q")
+
+
+def snapshot_path(date: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{date}.snapshot")
+
+
+class SortedTickers:
+    """The tickers in a snapshot file as a read-only sequence of bytes, for bisect"""
+
+    def __init__(self, offsets: memoryview, names: memoryview):
+        self.offsets = offsets
+        self.names = names
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.names[self.offsets[i] : self.offsets[i + 1]].tobytes()
+
+
+class MarketSnapshot:
+    """
+    End of day prices for one date, held as a sorted ticker array and a matching float64 price array.
+    Both arrays are memory-mapped, so opening a snapshot costs nothing and a lookup is a binary search.
+    """
+
+    def __init__(self, tickers: SortedTickers, prices: memoryview):
+        self.tickers = tickers
+        self.prices = prices
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def price(self, symbol: str) -> float:
+        key = symbol.encode()
+        i = bisect.bisect_left(self.tickers, key)
+        if i < len(self.tickers) and self.tickers[i] == key:
+            return self.prices[i]
+        return 0.0
+
+    def lookup(self, symbols: list[str]) -> dict[str, float]:
+        return {symbol: self.price(symbol) for symbol in symbols}
+
+
+def write_snapshot(date: str, data: dict[str, float]) -> None:
+    """Write the snapshot file for the date, replacing it atomically so readers never see partial data"""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tickers = sorted(data)
+    names = [ticker.encode() for ticker in tickers]
+    offsets = array("I", [0])
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+    prices = array("d", [data[ticker] for ticker in tickers])
+    path = snapshot_path(date)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(len(tickers)))
+        f.write(prices.tobytes())
+        f.write(offsets.tobytes())
+        f.write(b"".join(names))
+    os.replace(temp_path, path)
+
+
+def read_snapshot(date: str) -> MarketSnapshot | None:
+    path = snapshot_path(date)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    (count,) = HEADER.unpack(view[: HEADER.size])
+    prices_end = HEADER.size + 8 * count
+    offsets_end = prices_end + 4 * (count + 1)
+    prices = view[HEADER.size : prices_end].cast("d")
+    offsets = view[prices_end:offsets_end].cast("I")
+    return MarketSnapshot(SortedTickers(offsets, view[offsets_end:]), prices)
+
+
+# Run in a fresh interpreter so the timings include every import and file open a newly spawned server pays
+
+COLD_JSON_LOOKUP = """
+import time
+start = time.perf_counter()
+import json, sqlite3
+data = json.loads(sqlite3.connect("market.db").execute("SELECT data FROM market WHERE date = ?", ("{date}",)).fetchone()[0])
+prices = {{symbol: data.get(symbol, 0.0) for symbol in {symbols!r}}}
+print(time.perf_counter() - start)
+"""
+COLD_SNAPSHOT_LOOKUP = """
+import time
+start = time.perf_counter()
+from market_snapshot import read_snapshot
+prices = read_snapshot("{date}").lookup({symbols!r})
+print(time.perf_counter() - start)
+"""
+
+
+def benchmark(tickers: int = 12_000, runs: int = 20) -> None:
+    """
+    Time a cold-start price lookup in a new process: parsing the JSON blob from the market table, as before,
+    against opening the memory-mapped snapshot file
+    """
+    import json
+    import random
+    import sqlite3
+    import statistics
+    import subprocess
+    import sys
+    import tempfile
+
+    global SNAPSHOT_DIR
+    rng = random.Random(0)
+    names = set()
+    while len(names) < tickers:
+        names.add("".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=rng.randint(1, 5))))
+    data = {name: round(rng.uniform(1, 1000), 2) for name in sorted(names)}
+    symbols = rng.sample(sorted(names), 5)
+    date = "2025-01-02"
+    original_dir = SNAPSHOT_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        with sqlite3.connect(os.path.join(directory, "market.db")) as conn:
+            conn.execute("CREATE TABLE market (date TEXT PRIMARY KEY, data TEXT)")
+            conn.execute("INSERT INTO market (date, data) VALUES (?, ?)", (date, json.dumps(data)))
+        SNAPSHOT_DIR = os.path.join(directory, SNAPSHOT_DIR)
+        try:
+            write_snapshot(date, data)
+            assert read_snapshot(date).lookup(symbols) == {symbol: data[symbol] for symbol in symbols}
+        finally:
+            SNAPSHOT_DIR = original_dir
+        env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+        cases = {
+            "json blob from the market table": COLD_JSON_LOOKUP.format(date=date, symbols=symbols),
+            "memory-mapped snapshot": COLD_SNAPSHOT_LOOKUP.format(date=date, symbols=symbols),
+        }
+        print(f"Cold-start lookup of {len(symbols)} symbols among {len(data)} tickers, median of {runs} new processes")
+        for label, code in cases.items():
+            timings = [
+                float(
+                    subprocess.run(
+                        [sys.executable, "-c", code], cwd=directory, env=env, capture_output=True, text=True, check=True
+                    ).stdout
+                )
+                for _ in range(runs)
+            ]
+            print(f"{label:>32}: {statistics.median(timings) * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,189 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from agents.mcp import MCPServer
+from mcp_params import (
+    create_mcp_server,
+    trader_mcp_server_params,
+    researcher_shared_mcp_server_params,
+    memory_mcp_server_params,
+)
+
+CLIENT_SESSION_TIMEOUT_SECONDS = 120
+HEALTH_CHECK_TIMEOUT_SECONDS = 10
+
+
+class MissingMCPServers(Exception):
+    """Raised when a server a trader can't run without isn't running"""
+
+
+def describe(params: dict) -> str:
+    return params["url"] if "url" in params else " ".join(params["args"])
+
+
+class ManagedServer:
+    """
+    An MCP server that can be health-checked and restarted, with its startup time recorded.
+    in_use counts the trader runs holding it, so that a restart can wait for them to finish.
+    The server is connected and cleaned up inside its own task, because anyio requires its transport
+    context to be exited by the task that entered it; other tasks are free to make calls on it.
+    """
+
+    def __init__(self, label: str, params: dict):
+        self.label = label
+        self.params = params
+        self.server: MCPServer | None = None
+        self.startup_seconds: float | None = None
+        self.restarts = 0
+        self.in_use = 0
+        self.restart_pending = False
+        self.restart_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._stopping: asyncio.Event | None = None
+
+    async def start(self) -> None:
+        ready = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        await ready.wait()
+        if self.server is None:
+            await self._task
+
+    async def _run(self, ready: asyncio.Event) -> None:
+        server = create_mcp_server(
+            self.params,
+            cache_tools_list=True,
+            client_session_timeout_seconds=CLIENT_SESSION_TIMEOUT_SECONDS,
+        )
+        start = time.perf_counter()
+        try:
+            await server.connect()
+            self.startup_seconds = time.perf_counter() - start
+            self.server = server
+        finally:
+            ready.set()
+        try:
+            await self._stopping.wait()
+        finally:
+            self.server = None
+            try:
+                await server.cleanup()
+            except Exception as e:
+                print(f"Error stopping MCP server {self.label}: {e}")
+
+    async def healthy(self) -> bool:
+        if self.server is None or self.server.session is None or self._task.done():
+            return False
+        try:
+            await asyncio.wait_for(self.server.session.send_ping(), HEALTH_CHECK_TIMEOUT_SECONDS)
+            return True
+        except Exception:
+            return False
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        try:
+            await self._task
+        except Exception:
+            pass
+        self._task = None
+
+
+class MCPServerFleet:
+    """
+    Runs the stateless MCP servers (accounts, push, market, fetch, search) once for the whole trading floor,
+    and one memory server per trader, keeping them alive between cycles.
+    """
+
+    def __init__(self, trader_names: list[str]):
+        self.trader_servers = [ManagedServer(describe(params), params) for params in trader_mcp_server_params]
+        self.researcher_servers = [
+            ManagedServer(describe(params), params) for params in researcher_shared_mcp_server_params
+        ]
+        self.memory_servers = {
+            name: ManagedServer(f"memory for {name}", memory_mcp_server_params(name)) for name in trader_names
+        }
+
+    @property
+    def managed_servers(self) -> list[ManagedServer]:
+        return self.trader_servers + self.researcher_servers + list(self.memory_servers.values())
+
+    async def _start(self, managed: ManagedServer) -> None:
+        try:
+            await managed.start()
+        except Exception as e:
+            print(f"Failed to start MCP server {managed.label}: {e}")
+
+    async def start(self) -> None:
+        start = time.perf_counter()
+        await asyncio.gather(*[self._start(managed) for managed in self.managed_servers])
+        elapsed = time.perf_counter() - start
+        running = sum(1 for managed in self.managed_servers if managed.server)
+        print(f"Started {running}/{len(self.managed_servers)} MCP servers in {elapsed:.1f}s")
+        for label, seconds in self.startup_seconds().items():
+            print(f"  {label}: {seconds:.2f}s")
+
+    async def _restart(self, managed: ManagedServer) -> None:
+        if managed.restart_lock.locked():
+            return
+        async with managed.restart_lock:
+            managed.restart_pending = False
+            managed.restarts += 1
+            await managed.stop()
+            await self._start(managed)
+
+    async def supervise(self) -> None:
+        """
+        Restart any server that has crashed or stopped responding. A server that a trader run is using
+        is left alone until the last run holding it finishes, so no run loses a server part way through.
+        """
+        for managed in self.managed_servers:
+            if not await managed.healthy():
+                if managed.in_use:
+                    if not managed.restart_pending:
+                        print(f"MCP server {managed.label} is not responding; restarting once its runs finish")
+                    managed.restart_pending = True
+                    continue
+                print(f"MCP server {managed.label} is not responding; restarting")
+                await self._restart(managed)
+
+    @asynccontextmanager
+    async def servers_for(self, name: str):
+        """
+        Hold the running servers for the named trader for the length of a run, yielding (trader, researcher) lists.
+        A restart the supervisor deferred while they were held happens as the last holder lets go.
+        Raises MissingMCPServers if any of the trader's own servers isn't running, so the run is skipped
+        rather than spent without its account or market tools; a missing research server is only reported.
+        """
+        missing = [managed.label for managed in self.trader_servers if not managed.server]
+        if missing:
+            raise MissingMCPServers(f"MCP servers not running for {name}: {', '.join(missing)}")
+        trader = list(self.trader_servers)
+        researcher = [managed for managed in self.researcher_servers + [self.memory_servers[name]] if managed.server]
+        for managed in self.researcher_servers + [self.memory_servers[name]]:
+            if not managed.server:
+                print(f"MCP server {managed.label} is not running; {name}'s researcher will run without it")
+        held = trader + researcher
+        for managed in held:
+            managed.in_use += 1
+        try:
+            yield [managed.server for managed in trader], [managed.server for managed in researcher]
+        finally:
+            for managed in held:
+                managed.in_use -= 1
+            for managed in held:
+                if managed.restart_pending and not managed.in_use:
+                    print(f"Restarting MCP server {managed.label} now its runs have finished")
+                    await self._restart(managed)
+
+    def startup_seconds(self) -> dict[str, float]:
+        return {
+            managed.label: managed.startup_seconds
+            for managed in self.managed_servers
+            if managed.startup_seconds is not None
+        }
+
+    async def shutdown(self) -> None:
+        await asyncio.gather(*[managed.stop() for managed in self.managed_servers])
@@ -1,10 +1,11 @@
 import os
 from dotenv import load_dotenv
 from market import is_paid_polygon, is_realtime_polygon
+from mcp_transport import server_params, fetch_mcp, brave_search_mcp
+from agents.mcp import MCPServerStdio, MCPServerSse, MCPServerStreamableHttp
 
 load_dotenv(override=True)
 
-brave_env = {"BRAVE_API_KEY": os.getenv("BRAVE_API_KEY")}
 polygon_api_key = os.getenv("POLYGON_API_KEY")
 
 # The MCP server for the Trader to read Market Data
@@ -16,31 +17,46 @@ if is_paid_polygon or is_realtime_polygon:
         "env": {"POLYGON_API_KEY": polygon_api_key},
     }
 else:
-    market_mcp = {"command": "uv", "args": ["run", "market_server.py"]}
+    market_mcp = server_params("market_server")
 
 
 # The full set of MCP servers for the trader: Accounts, Push Notification and the Market
 
 trader_mcp_server_params = [
-    {"command": "uv", "args": ["run", "accounts_server.py"]},
-    {"command": "uv", "args": ["run", "push_server.py"]},
+    server_params("accounts_server"),
+    server_params("push_server"),
     market_mcp,
 ]
 
 # The full set of MCP servers for the researcher: Fetch, Brave Search and Memory
+# Fetch and Brave Search are stateless and can be shared; Memory holds each trader's own knowledge graph
+
+# By default both sit behind research_cache_server, which answers repeated fetches and searches from disk
+
+USE_RESEARCH_CACHE = os.getenv("USE_RESEARCH_CACHE", "true").strip().lower() == "true"
+
+if USE_RESEARCH_CACHE:
+    researcher_shared_mcp_server_params = [server_params("research_cache_server")]
+else:
+    researcher_shared_mcp_server_params = [fetch_mcp, brave_search_mcp]
+
+
+def memory_mcp_server_params(name: str):
+    return {
+        "command": "npx",
+        "args": ["-y", "mcp-memory-libsql"],
+        "env": {"LIBSQL_URL": f"file:./memory/{name}.db"},
+    }
 
 
 def researcher_mcp_server_params(name: str):
-    return [
-        {"command": "uvx", "args": ["mcp-server-fetch"]},
-        {
-            "command": "npx",
-            "args": ["-y", "@modelcontextprotocol/server-brave-search"],
-            "env": brave_env,
-        },
-        {
-            "command": "npx",
-            "args": ["-y", "mcp-memory-libsql"],
-            "env": {"LIBSQL_URL": f"file:./memory/{name}.db"},
-        },
-    ]
+    return researcher_shared_mcp_server_params + [memory_mcp_server_params(name)]
+
+
+def create_mcp_server(params: dict, **kwargs):
+    """Create the agents MCP server for a params dict: stdio for a command, otherwise sse or streamable http"""
+    if "url" not in params:
+        return MCPServerStdio(params, **kwargs)
+    if params["transport"] == "sse":
+        return MCPServerSse({"url": params["url"]}, **kwargs)
+    return MCPServerStreamableHttp({"url": params["url"]}, **kwargs)
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+load_dotenv(override=True)
+
+# stdio runs a subprocess per client; sse and streamable-http let one server process serve every client
+
+TRANSPORTS = ("stdio", "sse", "streamable-http")
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio").strip().lower()
+MCP_HOST = os.getenv("MCP_HOST", "127.0.0.1")
+
+SERVER_PORTS = {
+    "accounts_server": int(os.getenv("ACCOUNTS_SERVER_PORT", "8001")),
+    "market_server": int(os.getenv("MARKET_SERVER_PORT", "8002")),
+    "push_server": int(os.getenv("PUSH_SERVER_PORT", "8003")),
+    "research_cache_server": int(os.getenv("RESEARCH_CACHE_SERVER_PORT", "8004")),
+}
+
+HEALTH_CHECK_AFTER_SECONDS = 30
+HEALTH_CHECK_TIMEOUT_SECONDS = 5
+
+# The upstream Fetch and Brave Search servers, kept here so research_cache_server can reach them
+# without importing the trading code
+
+fetch_mcp = {"command": "uvx", "args": ["mcp-server-fetch"]}
+brave_search_mcp = {
+    "command": "npx",
+    "args": ["-y", "@modelcontextprotocol/server-brave-search"],
+    "env": {"BRAVE_API_KEY": os.getenv("BRAVE_API_KEY")},
+}
+
+
+def server_url(name: str, transport: str = MCP_TRANSPORT) -> str:
+    path = "sse" if transport == "sse" else "mcp"
+    return f"http://{MCP_HOST}:{SERVER_PORTS[name]}/{path}"
+
+
+def run_server(mcp, name: str) -> None:
+    """Run a FastMCP server with the transport from --transport or MCP_TRANSPORT, on its configured port"""
+    parser = argparse.ArgumentParser(description=f"Run the {name} MCP server")
+    parser.add_argument("--transport", choices=TRANSPORTS, default=MCP_TRANSPORT)
+    parser.add_argument("--host", default=MCP_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORTS[name])
+    args = parser.parse_args()
+    if args.transport != "stdio":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+    mcp.run(transport=args.transport)
+
+
+def server_params(name: str, transport: str = MCP_TRANSPORT) -> dict:
+    """Client params for one of the in-repo servers: a command to spawn for stdio, otherwise the URL to connect to"""
+    if transport == "stdio":
+        return {"command": "uv", "args": ["run", f"{name}.py"]}
+    return {"url": server_url(name, transport), "transport": transport}
+
+
+@asynccontextmanager
+async def open_streams(params: StdioServerParameters | dict):
+    """Open (read, write) streams to a server described by stdio params or by a url/transport dict"""
+    if isinstance(params, StdioServerParameters):
+        async with stdio_client(params) as streams:
+            yield streams[0], streams[1]
+    elif params["transport"] == "sse":
+        async with sse_client(params["url"]) as streams:
+            yield streams[0], streams[1]
+    else:
+        async with streamablehttp_client(params["url"]) as streams:
+            yield streams[0], streams[1]
+
+
+class PooledConnection:
+    """
+    One connection to an MCP server, a subprocess or a shared http server, with an initialized ClientSession.
+    The transport and session contexts are entered and exited inside a dedicated task,
+    as anyio requires, and the session stays open until close() is called.
+    """
+
+    def __init__(self, server_params: StdioServerParameters | dict):
+        self.server_params = server_params
+        self.session: ClientSession | None = None
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._error: BaseException | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error:
+            raise self._error
+
+    async def _run(self) -> None:
+        try:
+            async with open_streams(self.server_params) as streams:
+                async with ClientSession(*streams) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def healthy(self) -> bool:
+        """Ping the server if the connection has been idle for a while"""
+        if not self.alive:
+            return False
+        if time.monotonic() - self.last_used < HEALTH_CHECK_AFTER_SECONDS:
+            return True
+        try:
+            await asyncio.wait_for(self.session.send_ping(), HEALTH_CHECK_TIMEOUT_SECONDS)
+            return True
+        except Exception:
+            return False
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task:
+            await self._task
+
+
+async def load_test(transport: str = "streamable-http", clients: int = 50, calls_per_client: int = 20) -> None:
+    """
+    Start one accounts_server in a scratch directory and drive concurrent tool calls at it from many client sessions,
+    as the traders and the dashboard do when they share a server
+    """
+    with socket.socket() as probe:
+        probe.bind((MCP_HOST, 0))
+        port = probe.getsockname()[1]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "accounts_server.py")
+    server = subprocess.Popen(
+        [sys.executable, script, "--transport", transport, "--port", str(port)],
+        cwd=tempfile.mkdtemp(),
+        env={**os.environ, "FASTMCP_LOG_LEVEL": "WARNING"},
+    )
+    params = {"url": f"http://{MCP_HOST}:{port}/{'sse' if transport == 'sse' else 'mcp'}", "transport": transport}
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection((MCP_HOST, port), timeout=1).close()
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+
+        async def client(index: int) -> list[float]:
+            timings = []
+            async with open_streams(params) as streams:
+                async with ClientSession(*streams) as session:
+                    await session.initialize()
+                    for call in range(calls_per_client):
+                        tool = "get_balance" if call % 2 else "get_holdings"
+                        start = time.perf_counter()
+                        result = await session.call_tool(tool, {"name": f"trader{index % 10}"})
+                        timings.append(time.perf_counter() - start)
+                        assert not result.isError, result
+            return timings
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client(index) for index in range(clients)))
+        elapsed = time.perf_counter() - start
+        timings = sorted(timing for timings in results for timing in timings)
+        print(
+            f"{transport}: {len(timings)} tool calls from {clients} concurrent sessions in {elapsed:.1f}s, "
+            f"{len(timings) / elapsed:.0f} calls/sec, latency p50 {statistics.median(timings) * 1000:.1f}ms, "
+            f"p95 {timings[int(len(timings) * 0.95)] * 1000:.1f}ms"
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test one shared accounts_server")
+    parser.add_argument("--transport", choices=TRANSPORTS[1:], default="streamable-http")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(load_test(args.transport, args.clients, args.calls))
@@ -0,0 +1,100 @@
+import argparse
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from database import read_span_metrics
+
+# Approximate list prices in USD per million (input, output) tokens; update as providers change them
+
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "deepseek-chat": (0.27, 1.10),
+    "gemini-2.5-flash-preview-04-17": (0.15, 0.60),
+    "grok-3-mini-beta": (0.30, 0.50),
+}
+
+COLUMNS = ["trace_id", "name", "datetime", "kind", "label", "seconds", "input_tokens", "output_tokens"]
+
+
+def load_metrics(hours: float = 24) -> pd.DataFrame:
+    since = (datetime.now(timezone.utc) - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+    df = pd.DataFrame(read_span_metrics(since), columns=COLUMNS)
+    df["tokens"] = df["input_tokens"] + df["output_tokens"]
+    return df
+
+
+def model_prices(model: str) -> tuple[float, float]:
+    """
+    Prices for the longest MODEL_PRICES key the model name starts with, since responses
+    report dated snapshots such as gpt-4o-mini-2024-07-18
+    """
+    matches = [key for key in MODEL_PRICES if model.startswith(key)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else (0.0, 0.0)
+
+
+def cost(row) -> float:
+    input_price, output_price = model_prices(row["label"] or "")
+    return (row["input_tokens"] * input_price + row["output_tokens"] * output_price) / 1_000_000
+
+
+def p50(series: pd.Series) -> float:
+    return series.quantile(0.5)
+
+
+def p95(series: pd.Series) -> float:
+    return series.quantile(0.95)
+
+
+def summarize(df: pd.DataFrame, by: str, count_name: str) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame()
+    return (
+        df.groupby(by)
+        .agg(
+            **{count_name: ("seconds", "size")},
+            p50_seconds=("seconds", p50),
+            p95_seconds=("seconds", p95),
+            p50_tokens=("tokens", p50),
+            p95_tokens=("tokens", p95),
+            total_tokens=("tokens", "sum"),
+        )
+        .round(2)
+    )
+
+
+def trader_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """Per trader: run latency and tokens per run, and the estimated cost of all its model calls"""
+    summary = summarize(df[df["kind"] == "run"], "name", "runs")
+    generations = df[df["kind"] == "generation"]
+    if not summary.empty and not generations.empty:
+        costs = generations.assign(cost=generations.apply(cost, axis=1)).groupby("name")["cost"].sum()
+        summary["cost_usd"] = costs.reindex(summary.index).fillna(0.0).round(4)
+    return summary
+
+
+def model_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """Per model: latency and tokens per call"""
+    return summarize(df[df["kind"] == "generation"], "label", "calls")
+
+
+def tool_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """Per tool or MCP server: latency per call, slowest first"""
+    summary = summarize(df[df["kind"].isin(["tool", "mcp_list_tools"])], "label", "calls")
+    if summary.empty:
+        return summary
+    return summary[["calls", "p50_seconds", "p95_seconds"]].sort_values("p95_seconds", ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report latency, tokens and cost of trader runs")
+    parser.add_argument("--hours", type=float, default=24, help="How far back to report")
+    args = parser.parse_args()
+    df = load_metrics(args.hours)
+    if df.empty:
+        raise SystemExit(f"No run metrics recorded in the last {args.hours:g} hours")
+    for title, summary in (
+        ("Traders", trader_summary(df)),
+        ("Models", model_summary(df)),
+        ("Tools", tool_summary(df)),
+    ):
+        print(f"\n{title}\n{summary.to_string()}")
@@ -0,0 +1,121 @@
+from mcp.server.fastmcp import FastMCP
+from mcp import StdioServerParameters
+from mcp_transport import run_server, fetch_mcp, brave_search_mcp, PooledConnection
+from response_cache import ResponseCache, normalize_url, normalize_query
+import asyncio
+import json
+import os
+import sys
+
+mcp = FastMCP("research_cache_server")
+
+FETCH_TTL_SECONDS = int(os.getenv("RESEARCH_CACHE_FETCH_TTL_MINUTES", "360")) * 60
+SEARCH_TTL_SECONDS = int(os.getenv("RESEARCH_CACHE_SEARCH_TTL_MINUTES", "30")) * 60
+STATS_EVERY_N_CALLS = 50
+
+cache = ResponseCache()
+
+
+class Upstream:
+    """A long-lived session to one of the real MCP servers, reconnected if it dies"""
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.connection: PooledConnection | None = None
+        self.lock = asyncio.Lock()
+
+    async def call(self, tool: str, args: dict) -> str:
+        async with self.lock:
+            if self.connection is None or not self.connection.alive:
+                self.connection = PooledConnection(StdioServerParameters(**self.params))
+                await self.connection.start()
+            session = self.connection.session
+        result = await session.call_tool(tool, args)
+        text = "\n".join(item.text for item in result.content if item.type == "text")
+        if result.isError:
+            raise ValueError(text)
+        return text
+
+
+fetch_server = Upstream(fetch_mcp)
+brave_search_server = Upstream(brave_search_mcp)
+in_flight: dict[str, asyncio.Task] = {}
+calls = 0
+
+
+async def call_and_store(upstream: Upstream, tool: str, args: dict, key: str) -> str:
+    body = await upstream.call(tool, args)
+    cache.put(key, body)
+    return body
+
+
+async def cached_call(upstream: Upstream, tool: str, key_args: dict, args: dict, ttl: float) -> str:
+    """
+    Answer from the cache if a fresh response is stored under the normalized arguments, otherwise call through.
+    Identical requests that arrive while the first is still in flight share its upstream call.
+    """
+    global calls
+    calls += 1
+    if calls % STATS_EVERY_N_CALLS == 0:
+        print(f"Research cache: {cache.stats()}", file=sys.stderr)
+    key = cache.key(tool, key_args)
+    if key in in_flight:
+        cache.hits += 1
+    else:
+        body = cache.get(key, ttl)
+        if body is not None:
+            return body
+        in_flight[key] = asyncio.create_task(call_and_store(upstream, tool, args, key))
+        in_flight[key].add_done_callback(lambda _: in_flight.pop(key, None))
+    return await asyncio.shield(in_flight[key])
+
+
+@mcp.tool()
+async def fetch(url: str, max_length: int = 5000, start_index: int = 0, raw: bool = False) -> str:
+    """Fetches a URL from the internet and optionally extracts its contents as markdown.
+
+    Args:
+        url: URL to fetch
+        max_length: Maximum number of characters to return
+        start_index: Start the content from this character index, to continue a truncated fetch
+        raw: Get the actual HTML content of the requested page, without simplification
+    """
+    args = {"url": url, "max_length": max_length, "start_index": start_index, "raw": raw}
+    key_args = {**args, "url": normalize_url(url)}
+    return await cached_call(fetch_server, "fetch", key_args, args, FETCH_TTL_SECONDS)
+
+
+@mcp.tool()
+async def brave_web_search(query: str, count: int = 10, offset: int = 0) -> str:
+    """Performs a web search using the Brave Search API, ideal for general queries, news, articles, and online content.
+
+    Args:
+        query: Search query (max 400 chars, 50 words)
+        count: Number of results (1-20, default 10)
+        offset: Pagination offset (max 9, default 0)
+    """
+    args = {"query": query, "count": count, "offset": offset}
+    key_args = {**args, "query": normalize_query(query)}
+    return await cached_call(brave_search_server, "brave_web_search", key_args, args, SEARCH_TTL_SECONDS)
+
+
+@mcp.tool()
+async def brave_local_search(query: str, count: int = 5) -> str:
+    """Searches for local businesses and places using Brave's Local Search API.
+
+    Args:
+        query: Local search query (e.g. 'pizza near Central Park')
+        count: Number of results (1-20, default 5)
+    """
+    args = {"query": query, "count": count}
+    key_args = {**args, "query": normalize_query(query)}
+    return await cached_call(brave_search_server, "brave_local_search", key_args, args, SEARCH_TTL_SECONDS)
+
+
+@mcp.resource("research://cache_stats")
+async def read_stats_resource() -> str:
+    return json.dumps(cache.stats())
+
+
+if __name__ == "__main__":
+    run_server(mcp, "research_cache_server")
@@ -1,4 +1,5 @@
 from accounts import Account
+from valuation import value_all_accounts
 
 waren_strategy = """
 You are Warren, and you are named in homage to your role model, Warren Buffett.
@@ -40,6 +41,8 @@ You focus your trading on crypto ETFs.
 
 
 def reset_traders():
+    print("Standings before reset:")
+    print(value_all_accounts().leaderboard().to_string(index=False))
     Account.get("Warren").reset(waren_strategy)
     Account.get("George").reset(george_strategy)
     Account.get("Ray").reset(ray_strategy)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+CACHE_DIR = "research_cache"
+MAX_BYTES = int(os.getenv("RESEARCH_CACHE_MAX_MB", "200")) * 1024 * 1024
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref_src")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Lowercase the scheme and host, drop default ports, fragments and tracking parameters, and sort the query"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+class ResponseCache:
+    """
+    An on-disk cache of tool responses. Each response body is stored once under the hash of its content,
+    and a small SQLite index maps request keys to bodies with their age and last use.
+    Entries expire after their TTL, and the least recently used are evicted when the store outgrows max_bytes.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self.index = sqlite3.connect(os.path.join(directory, "index.db"), isolation_level=None)
+        self.index.execute("PRAGMA journal_mode=WAL")
+        self.index.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, digest TEXT, size INTEGER, created REAL, last_used REAL)"
+        )
+        self.index.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.index.execute("CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)")
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def key(self, tool: str, args: dict) -> str:
+        return hashlib.sha256(f"{tool}:{json.dumps(args, sort_keys=True)}".encode()).hexdigest()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def get(self, key: str, ttl: float) -> str | None:
+        row = self.index.execute("SELECT digest, created FROM entries WHERE key = ?", (key,)).fetchone()
+        if row and time.time() - row[1] > ttl:
+            self.expired += 1
+            self._delete(key, row[0])
+            row = None
+        if row:
+            try:
+                with open(self.object_path(row[0]), encoding="utf-8") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                self._delete(key, row[0])
+            else:
+                self.index.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                self.hits += 1
+                return body
+        self.misses += 1
+        return None
+
+    def put(self, key: str, body: str) -> None:
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        now = time.time()
+        previous = self.index.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+        self.index.execute(
+            "INSERT OR REPLACE INTO entries (key, digest, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, digest, len(data), now, now),
+        )
+        if previous and previous[0] != digest:
+            self._remove_orphan(previous[0])
+        self._evict()
+
+    def _delete(self, key: str, digest: str) -> bool:
+        self.index.execute("DELETE FROM entries WHERE key = ?", (key,))
+        return self._remove_orphan(digest)
+
+    def _remove_orphan(self, digest: str) -> bool:
+        """Delete the body file once no key refers to it, returning whether it was deleted"""
+        if self.index.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return False
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def total_bytes(self) -> int:
+        """Bytes on disk, counting each distinct body once"""
+        row = self.index.execute("SELECT SUM(size) FROM (SELECT MAX(size) AS size FROM entries GROUP BY digest)").fetchone()
+        return row[0] or 0
+
+    def _evict(self) -> None:
+        total = self.total_bytes()
+        while total > self.max_bytes:
+            row = self.index.execute("SELECT key, digest, size FROM entries ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            key, digest, size = row
+            if self._delete(key, digest):
+                total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": self.index.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+            "bytes": self.total_bytes(),
+        }
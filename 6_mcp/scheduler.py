@@ -0,0 +1,112 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from dotenv import load_dotenv
+from traders import Trader
+
+load_dotenv(override=True)
+
+RUN_EVERY_N_MINUTES = int(os.getenv("RUN_EVERY_N_MINUTES", "60"))
+JITTER_SECONDS = float(os.getenv("SCHEDULE_JITTER_SECONDS", "30"))
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS_PER_PROVIDER", "2"))
+DURATION_HISTORY = 50
+
+
+def interval_for(name: str) -> float:
+    """Seconds between runs for the trader, from RUN_EVERY_N_MINUTES_<NAME> or RUN_EVERY_N_MINUTES"""
+    return float(os.getenv(f"RUN_EVERY_N_MINUTES_{name.upper()}", RUN_EVERY_N_MINUTES)) * 60
+
+
+def concurrency_for(provider: str) -> int:
+    """Concurrent runs allowed against the provider, from MAX_CONCURRENT_RUNS_<PROVIDER> or the shared default"""
+    return int(os.getenv(f"MAX_CONCURRENT_RUNS_{provider.upper()}", MAX_CONCURRENT_RUNS))
+
+
+class RunMetrics:
+    """Counts and recent durations of one trader's runs, including time spent queued behind its provider"""
+
+    def __init__(self):
+        self.runs = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.durations: deque[float] = deque(maxlen=DURATION_HISTORY)
+        self.waits: deque[float] = deque(maxlen=DURATION_HISTORY)
+
+    def summary(self) -> dict:
+        return {
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "skipped": self.skipped,
+            "last_seconds": self.durations[-1] if self.durations else None,
+            "mean_seconds": sum(self.durations) / len(self.durations) if self.durations else None,
+            "max_seconds": max(self.durations, default=None),
+            "mean_wait_seconds": sum(self.waits) / len(self.waits) if self.waits else None,
+        }
+
+
+class TradingScheduler:
+    """
+    Runs each trader on its own cadence rather than all at once. Starts are spread out with random jitter,
+    runs against the same model provider are capped by a semaphore, and a run that overruns its interval
+    is never overlapped: the ticks it missed are coalesced into a single run as soon as it finishes.
+    While the market is closed each trader sleeps until the next session opens. The market calendar is consulted
+    in a worker thread, since it may refresh its holidays from Polygon.
+    """
+
+    def __init__(self, traders: list[Trader], fleet=None, seconds_until_open=None, jitter: float = JITTER_SECONDS):
+        self.traders = traders
+        self.fleet = fleet
+        self.seconds_until_open = seconds_until_open or (lambda: 0.0)
+        self.jitter = jitter
+        self.limits = {
+            provider: asyncio.Semaphore(concurrency_for(provider))
+            for provider in {trader.provider for trader in traders}
+        }
+        self.metrics = {trader.name: RunMetrics() for trader in traders}
+
+    async def run_once(self, trader: Trader) -> None:
+        metrics = self.metrics[trader.name]
+        queued = time.perf_counter()
+        async with self.limits[trader.provider]:
+            start = time.perf_counter()
+            metrics.waits.append(start - queued)
+            await trader.run(self.fleet)
+            metrics.durations.append(time.perf_counter() - start)
+        metrics.runs += 1
+        print(
+            f"{trader.name} ran in {metrics.durations[-1]:.1f}s "
+            f"after waiting {metrics.waits[-1]:.1f}s for {trader.provider}"
+        )
+
+    async def run_trader(self, trader: Trader) -> None:
+        interval = interval_for(trader.name)
+        metrics = self.metrics[trader.name]
+        await asyncio.sleep(random.uniform(0, self.jitter))
+        next_run = time.monotonic()
+        while True:
+            closed_for = await asyncio.to_thread(self.seconds_until_open)
+            if closed_for > 0:
+                metrics.skipped += 1
+                print(f"Market is closed; {trader.name} sleeping {closed_for / 3600:.1f} hours until it opens")
+                await asyncio.sleep(closed_for + random.uniform(0, self.jitter))
+                next_run = time.monotonic()
+                continue
+            await self.run_once(trader)
+            next_run += interval
+            now = time.monotonic()
+            if now >= next_run:
+                missed = int((now - next_run) // interval)
+                if missed:
+                    metrics.coalesced += missed
+                    next_run += missed * interval
+                    print(f"{trader.name} overran its interval; coalesced {missed + 1} due runs into one")
+                continue
+            await asyncio.sleep(next_run - now + random.uniform(0, self.jitter))
+
+    def summary(self) -> dict[str, dict]:
+        return {name: metrics.summary() for name, metrics in self.metrics.items()}
+
+    async def run_forever(self) -> None:
+        await asyncio.gather(*[self.run_trader(trader) for trader in self.traders])
@@ -0,0 +1,85 @@
+"""
+Fire hundreds of concurrent trades at one account from several server processes, then check nothing was lost.
+
+Each process runs the accounts_server buy_shares and sell_shares tools concurrently, so trades within a process
+contend for the per-account lock and trades across processes contend on the account's version.
+Afterwards the balance, holdings, version and cost basis must agree with the transactions that were recorded.
+Run with: python stress_trades.py [--processes 4] [--trades 100]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Every process works in the same scratch directory, so they share one scratch accounts.db
+os.chdir(os.environ.setdefault("STRESS_TRADES_DIR", tempfile.mkdtemp()))
+
+import market  # noqa: E402
+import accounts_server  # noqa: E402
+from accounts import Account  # noqa: E402
+from database import AccountVersionConflict  # noqa: E402
+
+NAME = "stress"
+SYMBOLS = ["AAPL", "MSFT", "NVDA"]
+STARTING_BALANCE = 1_000_000.0
+
+
+def trade(trades: int, seed: int) -> Counter:
+    """Run trades concurrent buys and sells in this process and count how each one ended"""
+    market.polygon_api_key = None
+    rng = random.Random(seed)
+
+    async def one(index: int) -> str:
+        symbol = rng.choice(SYMBOLS)
+        try:
+            if rng.random() < 0.7:
+                await accounts_server.buy_shares(NAME, symbol, rng.randint(1, 10), f"stress {seed}/{index}")
+            else:
+                await accounts_server.sell_shares(NAME, symbol, rng.randint(1, 5), f"stress {seed}/{index}")
+            return "filled"
+        except AccountVersionConflict:
+            return "conflict"
+        except ValueError:
+            return "rejected"
+
+    async def run() -> Counter:
+        return Counter(await asyncio.gather(*(one(index) for index in range(trades))))
+
+    return asyncio.run(run())
+
+
+def check(processes: int = 4, trades: int = 100) -> None:
+    account = Account.get(NAME)
+    account.reset("")
+    account.deposit(STARTING_BALANCE - account.balance)
+    start_version = account.version
+
+    with ProcessPoolExecutor(processes) as executor:
+        outcomes = sum(executor.map(trade, [trades] * processes, range(processes)), Counter())
+    print(f"{processes * trades} trades from {processes} processes: {dict(outcomes)}")
+
+    account = Account.get(NAME)
+    transactions = account.transactions
+    assert len(transactions) == outcomes["filled"], f"{len(transactions)} recorded, {outcomes['filled']} filled"
+    assert account.version == start_version + outcomes["filled"], f"version {account.version} lost updates"
+    positions = Counter()
+    for transaction in transactions:
+        positions[transaction.symbol] += transaction.quantity
+    assert account.holdings == {symbol: quantity for symbol, quantity in positions.items() if quantity}, account.holdings
+    total = sum(transaction.total() for transaction in transactions)
+    assert math.isclose(account.balance, STARTING_BALANCE - total, abs_tol=1e-6), f"balance {account.balance}"
+    assert math.isclose(account.net_invested, total, abs_tol=1e-6), f"net invested {account.net_invested}"
+    print("Balance, holdings, version and cost basis all match the recorded transactions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress test concurrent trades on one account")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--trades", type=int, default=100)
+    args = parser.parse_args()
+    check(args.processes, args.trades)
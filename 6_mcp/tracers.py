@@ -1,7 +1,11 @@
 from agents import TracingProcessor, Trace, Span
-from database import write_log
+from log_writer import log_writer
+from database import write_span_metrics
+from datetime import datetime, timezone
 import secrets
 import string
+import threading
+import time
 
 ALPHANUM = string.ascii_lowercase + string.digits 
 
@@ -15,25 +19,29 @@ def make_trace_id(tag: str) -> str:
     random_suffix = ''.join(secrets.choice(ALPHANUM) for _ in range(pad_len))
     return f"trace_{tag}{random_suffix}"
 
+def get_trader_name(trace_or_span: Trace | Span) -> str | None:
+    """The trader tag embedded in the trace id by make_trace_id, if there is one"""
+    trace_id = trace_or_span.trace_id
+    name = trace_id.split("_")[1]
+    if '0' in name:
+        return name.split("0")[0]
+    else:
+        return None
+
 class LogTracer(TracingProcessor):
 
     def get_name(self, trace_or_span: Trace | Span) -> str | None:
-        trace_id = trace_or_span.trace_id
-        name = trace_id.split("_")[1]
-        if '0' in name:
-            return name.split("0")[0]
-        else:
-            return None
+        return get_trader_name(trace_or_span)
 
     def on_trace_start(self, trace) -> None:
         name = self.get_name(trace)
         if name:
-            write_log(name, "trace", f"Started: {trace.name}")
+            log_writer.write(name, "trace", f"Started: {trace.name}")
 
     def on_trace_end(self, trace) -> None:
         name = self.get_name(trace)
         if name:
-            write_log(name, "trace", f"Ended: {trace.name}")
+            log_writer.write(name, "trace", f"Ended: {trace.name}")
 
     def on_span_start(self, span) -> None:
         name = self.get_name(span)
@@ -49,7 +57,7 @@ class LogTracer(TracingProcessor):
                     message += f" {span.span_data.server}"
             if span.error:
                 message += f" {span.error}"
-            write_log(name, type, message)
+            log_writer.write(name, type, message)
 
     def on_span_end(self, span) -> None:
         name = self.get_name(span)
@@ -66,10 +74,91 @@ class LogTracer(TracingProcessor):
                     message += f" {span.span_data.server}"
             if span.error:
                 message += f" {span.error}"
-            write_log(name, type, message)
+            log_writer.write(name, type, message)
+
+    def force_flush(self) -> None:
+        log_writer.flush()
+
+    def shutdown(self) -> None:
+        log_writer.shutdown()
+
+def span_seconds(span) -> float | None:
+    if not span.started_at or not span.ended_at:
+        return None
+    return (datetime.fromisoformat(span.ended_at) - datetime.fromisoformat(span.started_at)).total_seconds()
+
+
+def token_counts(usage) -> tuple[int, int]:
+    """Input and output tokens from a usage dict or object, whichever naming the model client used"""
+    if usage is None:
+        return 0, 0
+    if not isinstance(usage, dict):
+        usage = {key: getattr(usage, key, None) for key in ("input_tokens", "output_tokens")}
+    input_tokens = usage.get("input_tokens") or usage.get("prompt_tokens") or 0
+    output_tokens = usage.get("output_tokens") or usage.get("completion_tokens") or 0
+    return input_tokens, output_tokens
+
+
+class MetricsTracer(TracingProcessor):
+    """
+    Records the latency, model and token usage of every model call, and the latency of every tool
+    and MCP call, in a trader's run. They are held in memory for the run and written to the
+    span_metrics table in one go when its trace ends, together with a row for the run as a whole.
+    """
+
+    def __init__(self):
+        self._runs: dict[str, tuple[float, list[tuple]]] = {}
+        self._lock = threading.Lock()
+
+    def on_trace_start(self, trace) -> None:
+        if get_trader_name(trace):
+            with self._lock:
+                self._runs[trace.trace_id] = (time.perf_counter(), [])
+
+    def on_trace_end(self, trace) -> None:
+        with self._lock:
+            run = self._runs.pop(trace.trace_id, None)
+        if run is None:
+            return
+        start, rows = run
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        name = get_trader_name(trace)
+        input_tokens = sum(row[3] for row in rows)
+        output_tokens = sum(row[4] for row in rows)
+        rows = [(trace.trace_id, name, now, *row) for row in rows]
+        rows.append((trace.trace_id, name, now, "run", trace.name, time.perf_counter() - start, input_tokens, output_tokens))
+        try:
+            write_span_metrics(rows)
+        except Exception as e:
+            print(f"Could not write run metrics for {name}: {e}")
+
+    def on_span_start(self, span) -> None:
+        pass
+
+    def on_span_end(self, span) -> None:
+        data = span.span_data
+        seconds = span_seconds(span)
+        if data is None or seconds is None:
+            return
+        if data.type == "generation":
+            row = ("generation", data.model or "unknown", seconds, *token_counts(data.usage))
+        elif data.type == "response":
+            response = getattr(data, "response", None)
+            model = getattr(response, "model", None) or "unknown"
+            row = ("generation", model, seconds, *token_counts(getattr(response, "usage", None)))
+        elif data.type == "function":
+            row = ("tool", data.name, seconds, 0, 0)
+        elif data.type == "mcp_tools":
+            row = ("mcp_list_tools", data.server or "unknown", seconds, 0, 0)
+        else:
+            return
+        with self._lock:
+            run = self._runs.get(span.trace_id)
+            if run:
+                run[1].append(row)
 
     def force_flush(self) -> None:
         pass
 
     def shutdown(self) -> None:
-        pass
\ No newline at end of file
+        pass
@@ -6,7 +6,6 @@ from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
 import json
-from agents.mcp import MCPServerStdio
 from templates import (
     researcher_instructions,
     trader_instructions,
@@ -14,7 +13,8 @@ from templates import (
     rebalance_message,
     research_tool,
 )
-from mcp_params import trader_mcp_server_params, researcher_mcp_server_params
+from mcp_params import trader_mcp_server_params, researcher_mcp_server_params, create_mcp_server
+from mcp_fleet import MissingMCPServers
 
 load_dotenv(override=True)
 
@@ -36,6 +36,20 @@ grok_client = AsyncOpenAI(base_url=GROK_BASE_URL, api_key=grok_api_key)
 gemini_client = AsyncOpenAI(base_url=GEMINI_BASE_URL, api_key=google_api_key)
 
 
+def get_provider(model_name: str) -> str:
+    """The API provider that serves the model, matching the client get_model picks"""
+    if "/" in model_name:
+        return "openrouter"
+    elif "deepseek" in model_name:
+        return "deepseek"
+    elif "grok" in model_name:
+        return "grok"
+    elif "gemini" in model_name:
+        return "gemini"
+    else:
+        return "openai"
+
+
 def get_model(model_name: str):
     if "/" in model_name:
         return OpenAIChatCompletionsModel(model=model_name, openai_client=openrouter_client)
@@ -70,6 +84,7 @@ class Trader:
         self.lastname = lastname
         self.agent = None
         self.model_name = model_name
+        self.provider = get_provider(model_name)
         self.do_trade = True
 
     async def create_agent(self, trader_mcp_servers, researcher_mcp_servers) -> Agent:
@@ -104,28 +119,36 @@ class Trader:
         async with AsyncExitStack() as stack:
             trader_mcp_servers = [
                 await stack.enter_async_context(
-                    MCPServerStdio(params, client_session_timeout_seconds=120)
+                    create_mcp_server(params, client_session_timeout_seconds=120)
                 )
                 for params in trader_mcp_server_params
             ]
             async with AsyncExitStack() as stack:
                 researcher_mcp_servers = [
                     await stack.enter_async_context(
-                        MCPServerStdio(params, client_session_timeout_seconds=120)
+                        create_mcp_server(params, client_session_timeout_seconds=120)
                     )
                     for params in researcher_mcp_server_params(self.name)
                 ]
                 await self.run_agent(trader_mcp_servers, researcher_mcp_servers)
 
-    async def run_with_trace(self):
+    async def run_with_trace(self, fleet=None):
         trace_name = f"{self.name}-trading" if self.do_trade else f"{self.name}-rebalancing"
         trace_id = make_trace_id(f"{self.name.lower()}")
         with trace(trace_name, trace_id=trace_id):
-            await self.run_with_mcp_servers()
-
-    async def run(self):
+            if fleet:
+                async with fleet.servers_for(self.name) as (trader_mcp_servers, researcher_mcp_servers):
+                    await self.run_agent(trader_mcp_servers, researcher_mcp_servers)
+            else:
+                await self.run_with_mcp_servers()
+
+    async def run(self, fleet=None):
+        """Run one trading cycle, using the shared servers of the fleet if one is given"""
         try:
-            await self.run_with_trace()
+            await self.run_with_trace(fleet)
+        except MissingMCPServers as e:
+            print(f"Skipping this run of {self.name}: {e}")
+            return
         except Exception as e:
             print(f"Error running trader {self.name}: {e}")
         self.do_trade = not self.do_trade
@@ -1,18 +1,21 @@
 from traders import Trader
 from typing import List
 import asyncio
-from tracers import LogTracer
+from tracers import LogTracer, MetricsTracer
 from agents import add_trace_processor
-from market import is_market_open
+from market_calendar import calendar
+from accounts_client import pool as accounts_client_pool
+from mcp_fleet import MCPServerFleet
+from scheduler import TradingScheduler, RUN_EVERY_N_MINUTES
 from dotenv import load_dotenv
 import os
 
 load_dotenv(override=True)
 
-RUN_EVERY_N_MINUTES = int(os.getenv("RUN_EVERY_N_MINUTES", "60"))
 RUN_EVEN_WHEN_MARKET_IS_CLOSED = (
     os.getenv("RUN_EVEN_WHEN_MARKET_IS_CLOSED", "false").strip().lower() == "true"
 )
+SUPERVISE_EVERY_N_SECONDS = 60
 USE_MANY_MODELS = os.getenv("USE_MANY_MODELS", "false").strip().lower() == "true"
 
 names = ["Warren", "George", "Ray", "Cathie"]
@@ -38,17 +41,36 @@ def create_traders() -> List[Trader]:
     return traders
 
 
+def seconds_until_open() -> float:
+    if RUN_EVEN_WHEN_MARKET_IS_CLOSED:
+        return 0.0
+    return calendar.seconds_until_open()
+
+
+async def supervise_fleet(fleet: MCPServerFleet):
+    while True:
+        await asyncio.sleep(SUPERVISE_EVERY_N_SECONDS)
+        await fleet.supervise()
+
+
 async def run_every_n_minutes():
     add_trace_processor(LogTracer())
+    add_trace_processor(MetricsTracer())
     traders = create_traders()
-    while True:
-        if RUN_EVEN_WHEN_MARKET_IS_CLOSED or is_market_open():
-            await asyncio.gather(*[trader.run() for trader in traders])
-        else:
-            print("Market is closed, skipping run")
-        await asyncio.sleep(RUN_EVERY_N_MINUTES * 60)
+    fleet = MCPServerFleet(names)
+    await fleet.start()
+    scheduler = TradingScheduler(traders, fleet, seconds_until_open)
+    supervisor = asyncio.create_task(supervise_fleet(fleet))
+    try:
+        await scheduler.run_forever()
+    finally:
+        supervisor.cancel()
+        for name, summary in scheduler.summary().items():
+            print(f"{name}: {summary}")
+        await fleet.shutdown()
+        await accounts_client_pool.close()
 
 
 if __name__ == "__main__":
-    print(f"Starting scheduler to run every {RUN_EVERY_N_MINUTES} minutes")
+    print(f"Starting scheduler to run each trader every {RUN_EVERY_N_MINUTES} minutes")
     asyncio.run(run_every_n_minutes())
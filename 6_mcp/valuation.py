@@ -0,0 +1,197 @@
+import time
+import numpy as np
+import pandas as pd
+from accounts import Account
+from market import get_share_prices
+from database import read_all_positions, read_accounts_revision
+
+
+class PortfolioValuation:
+    """
+    Every account valued at once from a dense account x symbol holdings matrix and a symbol price vector.
+    Row i of holdings belongs to names[i] and column j to symbols[j].
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        symbols: list[str],
+        holdings: np.ndarray,
+        prices: np.ndarray,
+        cash: np.ndarray,
+        net_invested: np.ndarray,
+    ):
+        self.names = names
+        self.symbols = symbols
+        self.holdings = holdings
+        self.prices = prices
+        self.cash = cash
+        self.invested = holdings @ prices
+        self.values = cash + self.invested
+        self.pnl = self.invested - net_invested
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.exposure = np.where(self.values > 0, self.invested / self.values, 0.0)
+
+    def reprice(self, prices: dict[str, float]) -> "PortfolioValuation":
+        """Revalue the same holdings at new prices without rebuilding the matrix"""
+        price_vector = np.array([prices.get(symbol, 0.0) for symbol in self.symbols], dtype=np.float64)
+        return PortfolioValuation(
+            self.names, self.symbols, self.holdings, price_vector, self.cash, self.invested - self.pnl
+        )
+
+    def exposures(self, name: str) -> dict[str, float]:
+        """The market value of each position held by the named account"""
+        row = self.holdings[self.names.index(name.lower())] * self.prices
+        return {self.symbols[j]: float(row[j]) for j in np.flatnonzero(row)}
+
+    def leaderboard(self, top: int | None = None) -> pd.DataFrame:
+        order = np.argsort(-self.values)[:top]
+        return pd.DataFrame(
+            {
+                "Rank": np.arange(1, len(order) + 1),
+                "Trader": [self.names[i].title() for i in order],
+                "Value": self.values[order].round(2),
+                "P&L": self.pnl[order].round(2),
+                "Cash": self.cash[order].round(2),
+                "Exposure": (self.exposure[order] * 100).round(1),
+            }
+        )
+
+
+def holdings_matrix(
+    names: list[str], positions: list[tuple[str, str, int]]
+) -> tuple[list[str], np.ndarray]:
+    """Scatter (name, symbol, quantity) rows into a dense matrix over just the symbols actually held"""
+    rows = {name: i for i, name in enumerate(names)}
+    columns = {}
+    count = len(positions)
+    row_index = np.fromiter((rows[name] for name, _, _ in positions), np.intp, count)
+    column_index = np.fromiter((columns.setdefault(symbol, len(columns)) for _, symbol, _ in positions), np.intp, count)
+    quantities = np.fromiter((quantity for _, _, quantity in positions), np.float64, count)
+    matrix = np.zeros((len(names), len(columns)))
+    matrix[row_index, column_index] = quantities
+    return list(columns), matrix
+
+
+def value_positions(
+    names: list[str],
+    cash: list[float],
+    net_invested: list[float],
+    positions: list[tuple[str, str, int]],
+    prices: dict[str, float] | None = None,
+) -> PortfolioValuation:
+    """Value the accounts, fetching every held symbol's price in one call unless prices are given"""
+    symbols, matrix = holdings_matrix(names, positions)
+    if prices is None:
+        prices = get_share_prices(symbols) if symbols else {}
+    price_vector = np.array([prices.get(symbol, 0.0) for symbol in symbols], dtype=np.float64)
+    return PortfolioValuation(
+        names,
+        symbols,
+        matrix,
+        price_vector,
+        np.asarray(cash, dtype=np.float64),
+        np.asarray(net_invested, dtype=np.float64),
+    )
+
+
+# The last valuation built by each caller, with the account versions or revision it was built from
+_valuations: dict[str, tuple[object, PortfolioValuation]] = {}
+
+
+def reprice_cached(cache_key: str, versions, prices: dict[str, float] | None) -> PortfolioValuation | None:
+    """
+    The last valuation stored under cache_key at new prices, if the accounts are still at the versions it was
+    built from; repricing is far cheaper than rebuilding the holdings matrix
+    """
+    cached = _valuations.get(cache_key)
+    if cached is None or cached[0] != versions:
+        return None
+    valuation = cached[1]
+    if prices is None:
+        prices = get_share_prices(valuation.symbols) if valuation.symbols else {}
+    return valuation.reprice(prices)
+
+
+def value_accounts(accounts: list[Account], prices: dict[str, float] | None = None) -> PortfolioValuation:
+    """Value accounts already loaded in memory, such as the dashboard's traders"""
+    versions = [(account.name.lower(), account.version) for account in accounts]
+    valuation = reprice_cached("accounts", versions, prices)
+    if valuation is None:
+        valuation = value_positions(
+            [account.name.lower() for account in accounts],
+            [account.balance for account in accounts],
+            [account.net_invested or 0.0 for account in accounts],
+            [
+                (account.name.lower(), symbol, quantity)
+                for account in accounts
+                for symbol, quantity in account.holdings.items()
+            ],
+            prices,
+        )
+        _valuations["accounts"] = (versions, valuation)
+    return valuation
+
+
+def value_all_accounts(prices: dict[str, float] | None = None) -> PortfolioValuation:
+    """
+    Value every account in the database from one consistent read and one price lookup.
+    Legacy accounts whose aggregates haven't been rebuilt yet are rebuilt first, so their P&L is right.
+    While no account has been saved since the last call, the last valuation is just repriced.
+    """
+    valuation = reprice_cached("all", read_accounts_revision(), prices)
+    if valuation is not None:
+        return valuation
+    totals, positions = read_all_positions()
+    while legacy := [name for name, _, net_invested, _ in totals if net_invested is None]:
+        for name in legacy:
+            Account.get(name)
+        totals, positions = read_all_positions()
+    valuation = value_positions(
+        [name for name, _, _, _ in totals],
+        [balance for _, balance, _, _ in totals],
+        [net_invested for _, _, net_invested, _ in totals],
+        positions,
+        prices,
+    )
+    _valuations["all"] = ((len(totals), sum(version for _, _, _, version in totals)), valuation)
+    return valuation
+
+
+def benchmark(account_counts=(10, 1_000, 100_000), universe: int = 200, positions_per_account: int = 10) -> None:
+    """Time building the matrix and repricing synthetic accounts, against a loop over every holding"""
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i:04d}" for i in range(universe)]
+    prices = dict(zip(tickers, rng.uniform(5, 500, universe)))
+    for count in account_counts:
+        names = [f"account{i:06d}" for i in range(count)]
+        positions = [
+            (name, tickers[j], int(quantity))
+            for name in names
+            for j, quantity in zip(
+                rng.choice(universe, positions_per_account, replace=False),
+                rng.integers(1, 100, positions_per_account),
+            )
+        ]
+        cash = rng.uniform(0, 10_000, count).tolist()
+        start = time.perf_counter()
+        valuation = value_positions(names, cash, [0.0] * count, positions, prices)
+        built = time.perf_counter() - start
+        new_prices = {ticker: price * rng.uniform(0.95, 1.05) for ticker, price in prices.items()}
+        start = time.perf_counter()
+        valuation = valuation.reprice(new_prices)
+        repriced = time.perf_counter() - start
+        start = time.perf_counter()
+        values = dict(zip(names, cash))
+        for name, symbol, quantity in positions:
+            values[name] += new_prices[symbol] * quantity
+        looped = time.perf_counter() - start
+        assert np.allclose(valuation.values, [values[name] for name in names])
+        print(
+            f"{count:>7} accounts: build {built * 1000:8.1f}ms, reprice {repriced * 1000:8.1f}ms, "
+            f"per-holding loop {looped * 1000:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()